@@ -1,5 +1,5 @@
 from math import *
-import stl
+import numpy as np
 
 
 ################################
@@ -14,135 +14,111 @@ import stl
 #rootChord: chord at root (float)
 #tipChord: chord at tip (float)
 #cot: center of twist coordinates (list)
+#nspan: number of spanwise segments lofted root to tip (int)
+#npts: number of chordwise points per surface (int)
 ##Returns:
-#(faces, verts): list of faces and list of verts
+#(verts, faces): float64 (n, 3) vertex array and int32 (m, 3) face array
 ################################
 def NACA4Blade(camberRoot, camberTip, camberPos, thickness,\
-                        bladeHeight, twistAngle, rootChord, tipChord, cot):
+                        bladeHeight, twistAngle, rootChord, tipChord, cot, nspan = 1, npts = 24):
+    
+    if nspan < 1 or npts < 2:
+        raise ValueError('NACA4Blade needs nspan >= 1 and npts >= 2')
     
     twist = radians(twistAngle) / bladeHeight
     
     cot = [x / 100 for x in cot]
     
-    nspan = 1
-    npts = 24
     dspan = bladeHeight / nspan
 
-    xUpTwist= [0]*npts
-    yUpTwist= [0]*npts
-    xLowTwist= [0]*npts
-    yLowTwist= [0]*npts
-    faces = []
-    verts = []
-    origin = (0, 0, 0)
-    
-    #Generate Vertices for Unmodified Airfoil Shape
-    for j in range(0, nspan + 1):
-        x = []
-        yThickness = []
-        yCamber =[]
-        xUpper = []
-        xLower = []
-        yUpper =[]
-        yLower =[]
-        
-        m = (1 - j / nspan) * camberRoot + j / nspan * camberTip   
-
-        
-        #NACA4Profile
-        for i in range(0, npts + 1):
-            x.append(1 - cos(i * (pi / 2) / npts))
-            yThickness.append(thickness / 0.2 * (0.2969 * pow(x[i], 0.5) - 0.126 * x[i] - 0.3516 * pow(x[i], 2) + 0.2843 * pow(x[i], 3) - 0.1015 * pow(x[i], 4)))
-            
-            if (x[i] < camberPos):
-                yCamber.append(m / pow(camberPos, 2) * (2 * camberPos * x[i] - pow(x[i], 2)))
-                dycdx = 2 * m / pow(camberPos, 2) * (camberPos - x[i])
-                
-            else:
-                yCamber.append(m / pow(1 - camberPos, 2) * (1 - 2 * camberPos + 2 * camberPos * x[i] - pow(x[i], 2)))
-                dycdx = 2 * m / pow(1 - camberPos , 2) * (camberPos - x[i])
-                
-            x[i] -= cot[0]
-            yCamber[i] -= cot[1]
-        
-            #Upper and Lower Vertices
-            xUpper.append(x[i] - yThickness[i] * (sin(atan(dycdx))))
-            yUpper.append(yCamber[i] + yThickness[i] * (cos(atan(dycdx))))
-            xLower.append(x[i] + yThickness[i] * (sin(atan(dycdx))))
-            yLower.append(yCamber[i] - yThickness[i] * (cos(atan(dycdx))))
-        
-        #Generate Vertices Following Twist
-        angle = twist * j * dspan
-        chord = rootChord - j * dspan * (rootChord - tipChord) / bladeHeight
-        
-        for i in range(0, npts):
-            xUpTwist[i] = (xUpper[i] * cos(angle) - yUpper[i] * sin(angle)) * chord
-            yUpTwist[i] = (xUpper[i] * sin(angle) + yUpper[i] * cos(angle)) * chord
-            
-            verts.append([xUpTwist[i], yUpTwist[i], j * dspan])
-
-        for i in range(0, npts):
+    #Chordwise Stations (Columns) and Spanwise Stations (Rows)
+    x = 1 - np.cos(np.arange(npts) * (pi / 2) / npts)
+    j = np.arange(nspan + 1, dtype = np.float64)[:, np.newaxis]
+    
+    m = (1 - j / nspan) * camberRoot + j / nspan * camberTip
+    
+    #NACA4Profile
+    yThickness = thickness / 0.2 * (0.2969 * np.sqrt(x) - 0.126 * x - 0.3516 * x ** 2 + 0.2843 * x ** 3 - 0.1015 * x ** 4)
+    fore = x < camberPos
+    yCamber = np.where(fore, m / camberPos ** 2 * (2 * camberPos * x - x ** 2),
+                        m / (1 - camberPos) ** 2 * (1 - 2 * camberPos + 2 * camberPos * x - x ** 2))
+    dycdx = np.where(fore, 2 * m / camberPos ** 2 * (camberPos - x),
+                        2 * m / (1 - camberPos) ** 2 * (camberPos - x))
+    
+    x = x - cot[0]
+    yCamber -= cot[1]
+    
+    #Upper and Lower Vertices
+    theta = np.arctan(dycdx)
+    sinTheta = yThickness * np.sin(theta)
+    cosTheta = yThickness * np.cos(theta)
+    xProf = np.concatenate([x - sinTheta, x + sinTheta], axis = 1)
+    yProf = np.concatenate([yCamber + cosTheta, yCamber - cosTheta], axis = 1)
+    
+    #Generate Vertices Following Twist
+    angle = twist * j * dspan
+    chord = rootChord - j * dspan * (rootChord - tipChord) / bladeHeight
+    
+    verts = np.empty((nspan + 1, 2 * npts, 3))
+    verts[:, :, 0] = (xProf * np.cos(angle) - yProf * np.sin(angle)) * chord
+    verts[:, :, 1] = (xProf * np.sin(angle) + yProf * np.cos(angle)) * chord
+    verts[:, :, 2] = j * dspan
+    
+    return (verts.reshape(-1, 3), _NACA4BladeFaces(nspan, npts))
+    
 
-            xLowTwist[i] = (xLower[i] * cos(angle) - yLower[i] * sin(angle)) * chord
-            yLowTwist[i] = (xLower[i] * sin(angle) + yLower[i] * cos(angle)) * chord
-            
-            
-            verts.append([xLowTwist[i], yLowTwist[i], j * dspan])
+################################
+##Function: _NACA4BladeFaces
+#Builds face topology for a lofted NACA4Blade
+##Inputs:
+#nspan: number of spanwise segments (int)
+#npts: number of chordwise points per surface (int)
+##Returns:
+#faces: int32 (m, 3) face array
+################################
+def _NACA4BladeFaces(nspan, npts):
+    i = np.arange(npts - 1)
+    nPerStage = npts * 2
     
     #Bottom Prof
-    faces.append([0, 1, npts + 1])
-    for i in range(0, npts - 1):
-        faces.append([i, i + 1, npts + i + 1])    
-        faces.append([i, npts + i + 1, npts + i])    
-
+    bottom = np.stack([[i, i + 1, npts + i + 1], [i, npts + i + 1, npts + i]], axis = 1)
+    bottom = [[[0, 1, npts + 1]], bottom.transpose(2, 1, 0).reshape(-1, 3)]
+    
     #Sides
-    nPerStage = npts * 2
-    for j in range(0, nspan):
-        for i in range(0, npts - 1):
-            faces.append([nPerStage * j + i, nPerStage * (j + 1) + i, nPerStage * (j + 1) + i + 1])
-            faces.append([nPerStage * j + i, nPerStage * (j + 1) + i + 1, nPerStage * j + i + 1])
-            
-        for i in range(0, npts - 1):
-            faces.append([nPerStage * j + i + npts, nPerStage * (j + 1) + i + 1 + npts, nPerStage * (j + 1) + i + npts])
-            faces.append([nPerStage * j + i + npts, nPerStage * j + i + 1 + npts, nPerStage * (j + 1) + i + 1 + npts])
-        faces.append([nPerStage * j + npts - 1, nPerStage * (j + 1) + npts - 1, nPerStage * (j + 1) + npts * 2 - 1])
-        faces.append([nPerStage * j + npts - 1, nPerStage * (j + 1) + npts * 2 - 1, nPerStage * j +npts * 2 - 1])
-        
+    lo = nPerStage * np.arange(nspan)[:, np.newaxis]
+    hi = lo + nPerStage
+    upper = np.stack([np.stack([lo + i, hi + i, hi + i + 1], axis = -1),
+                        np.stack([lo + i, hi + i + 1, lo + i + 1], axis = -1)], axis = 2)
+    lower = np.stack([np.stack([lo + i + npts, hi + i + 1 + npts, hi + i + npts], axis = -1),
+                        np.stack([lo + i + npts, lo + i + 1 + npts, hi + i + 1 + npts], axis = -1)], axis = 2)
+    trail = np.stack([np.concatenate([lo + npts - 1, hi + npts - 1, hi + npts * 2 - 1], axis = 1),
+                        np.concatenate([lo + npts - 1, hi + npts * 2 - 1, lo + npts * 2 - 1], axis = 1)], axis = 1)
+    sides = np.concatenate([upper.reshape(nspan, -1, 3), lower.reshape(nspan, -1, 3), trail], axis = 1)
+    
     #Top Prof
-    faces.append([nPerStage * nspan, nPerStage * nspan + 1, nPerStage * nspan + npts + 1])
-    for i in range(0, npts - 1):
-        faces.append([nPerStage * nspan + i, nPerStage * nspan + npts + i + 1, nPerStage * nspan + i + 1])    
-        faces.append([nPerStage * nspan + i, nPerStage * nspan + npts + i, nPerStage * nspan + npts + i + 1])  
+    top = nPerStage * nspan
+    cap = np.stack([[top + i, top + npts + i + 1, top + i + 1], [top + i, top + npts + i, top + npts + i + 1]], axis = 1)
+    cap = [[[top, top + 1, top + npts + 1]], cap.transpose(2, 1, 0).reshape(-1, 3)]
     
-    return (faces, verts)
+    return np.ascontiguousarray(np.concatenate(bottom + [sides.reshape(-1, 3)] + cap), dtype = np.int32)
     
     
 ################################
 ##Function: FindBounds
-#Calculates bounding box for given object
+#Calculates bounding box for given object, uses
+#the cached bounds of an IndexedMesh when present
 ##Inputs:
 #obj: object to be bounded (mesh)
 ##Returns:
 #minx, maxx, miny, maxy, minz, maxz: (floats)
 ################################
 def FindBounds(obj):
-    minx = maxx = miny = maxy = minz = maxz = None
-    for p in obj.points:
-        if minx is None:
-            minx = p[stl.Dimension.X]
-            maxx = p[stl.Dimension.X]
-            miny = p[stl.Dimension.Y]
-            maxy = p[stl.Dimension.Y]
-            minz = p[stl.Dimension.Z]
-            maxz = p[stl.Dimension.Z]
-            
-        else:
-            maxx = max(p[stl.Dimension.X], maxx)
-            minx = min(p[stl.Dimension.X], minx)
-            maxy = max(p[stl.Dimension.Y], maxy)
-            miny = min(p[stl.Dimension.Y], miny)
-            maxz = max(p[stl.Dimension.Z], maxz)
-            minz = min(p[stl.Dimension.Z], minz)
+    bounds = getattr(obj, 'bounds', None)
+    if bounds is None:
+        points = obj.vectors.reshape(-1, 3)
+        bounds = (points.min(axis = 0), points.max(axis = 0))
+        
+    (minx, miny, minz), (maxx, maxy, maxz) = bounds
             
     return minx, maxx, miny, maxy, minz, maxz
 
@@ -183,6 +159,7 @@ class LinearStageProp():
     tipProps = StageProps()
     rootRadius = 0
     tipRadius = 0
+    converged = True
     
  
 ################################
@@ -215,6 +192,111 @@ def CalcStageBladeAngles(r, phi, psi, rpm, radius):
     return stageProps
     
 
+################################
+##Function: CalcStageBladeAnglesArray
+#Calculates stage angles for any number of stations
+#and designs at once, inputs broadcast against each
+#other like any numpy expression
+##Inputs:
+#r: reaction (array)
+#phi: flow (array)
+#psi: loading (array)
+#rpm: ...rpm (array)
+#radius: radius of stage (array)
+##Returns:
+#stageProps: stage properties (object) holding arrays
+################################ 
+def CalcStageBladeAnglesArray(r, phi, psi, rpm, radius):
+    r, phi, psi, rpm, radius = np.broadcast_arrays(*[np.asarray(x, dtype = np.float64) for x in (r, phi, psi, rpm, radius)])
+    
+    u = rpm / 60 * 2 * pi * radius / 1000
+    stageProps = StageProps()
+    stageProps.rpm = rpm
+    stageProps.radius = radius
+    stageProps.r = r
+    stageProps.phi = phi
+    stageProps.psi = psi
+    
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        stageProps.beta2 = np.arctan((r - psi / 2)  / phi)
+        stageProps.beta1 = np.arctan(psi / phi + (2 * r - psi) / (2 * phi))
+        stageProps.cx = phi * u
+        
+        #c = u - cx * tan(beta), Same as u - w * sin(beta)
+        c1 = u - stageProps.cx * np.tan(stageProps.beta1)
+        c2 = u - stageProps.cx * np.tan(stageProps.beta2)
+        stageProps.alpha1 = np.arctan(c1 / stageProps.cx)
+        stageProps.alpha2 = np.arctan(c2 / stageProps.cx)
+    
+    return stageProps
+    
+    
+################################
+##Function: StageCalcArray
+#Array version of StageCalc, root and tip flow
+#coefficients are matched to the mean line directly
+##Inputs:
+#r: reaction (array)
+#phi: flow (array)
+#psi: loading (array)
+#rpm: ...rpm (array)
+#rootRadius: hub radius of stage (array)
+#tipRadius: radius of stage (array)
+##Returns:
+#stageProps: stage properties (object) holding arrays,
+#stageProps.converged marks the valid entries
+################################
+def StageCalcArray(r, phi, psi, rpm, rootRadius, tipRadius):
+    rootRadius = np.asarray(rootRadius, dtype = np.float64)
+    tipRadius = np.asarray(tipRadius, dtype = np.float64)
+    
+    stageProps = LinearStageProp()
+    stageProps.rootRadius = rootRadius
+    stageProps.tipRadius = tipRadius
+    
+    mlr = (rootRadius + tipRadius) / 2
+    stageProps.meanProps = CalcStageBladeAnglesArray(r = r, phi = phi, psi = psi, rpm = rpm, radius = mlr)
+    
+    #cx = phi * u and u Scales With Radius
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        rootPhi = stageProps.meanProps.phi * mlr / rootRadius
+        tipPhi = stageProps.meanProps.phi * mlr / tipRadius
+        
+    stageProps.rootProps = CalcStageBladeAnglesArray(r = r, phi = rootPhi, psi = psi, rpm = rpm, radius = rootRadius)
+    stageProps.tipProps = CalcStageBladeAnglesArray(r = r, phi = tipPhi, psi = psi, rpm = rpm, radius = tipRadius)
+    stageProps.converged = (np.isfinite(rootPhi) & np.isfinite(tipPhi) & (rootRadius > 0) & (tipRadius > 0)
+                                & (stageProps.meanProps.rpm != 0))
+    
+    return stageProps
+    
+    
+################################
+##Function: SolveStagePhi
+#Finds the flow coefficient at a radius that matches
+#a target axial velocity, cx = phi * u is linear in phi
+#so the direct solve is exact
+##Inputs:
+#cx: target axial velocity (float)
+#rpm: ...rpm (float)
+#radius: radius of station (float)
+##Returns:
+#(phi, converged): flow coefficient (float), converged is
+#False when the station has no blade speed (zero radius)
+#or cx is not finite (bool). Zero RPM never gets here, the
+#mean line calculation divides by zero first
+################################
+def SolveStagePhi(cx, rpm, radius):
+    u = rpm / 60 * 2 * pi * radius / 1000
+    
+    #No Blade Speed, No Solution
+    if u == 0 or not isfinite(u):
+        return nan, False
+    
+    phi = cx / u
+        
+    return phi, isfinite(phi)
+    
+    
 ################################
 ##Function: StageCalc
 #Calculates propeties of whole stage
@@ -226,7 +308,8 @@ def CalcStageBladeAngles(r, phi, psi, rpm, radius):
 #rootRadius: hub radius of stage (float)
 #tipRadius: radius of stage (float)
 ##Returns:
-#stageProps: stage properties (object)
+#stageProps: stage properties (object), stageProps.converged
+#is False if the root or tip could not be matched
 ################################
 def StageCalc(r, phi, psi, rpm, rootRadius, tipRadius):
     stageProps = LinearStageProp()
@@ -240,45 +323,19 @@ def StageCalc(r, phi, psi, rpm, rootRadius, tipRadius):
     stageProps.meanProps.psi = psi
     stageProps.meanProps.phi = phi
     
-    stageProps.rootProps = CalcStageBladeAngles(r = r, phi = phi, psi = psi, rpm = rpm, radius = rootRadius)
-    
-    lphi = 1e-6
-    hphi = 2 - 1e-6
-    rootPhi = phi
-    
-    while (abs(stageProps.meanProps.cx - stageProps.rootProps.cx) > 1e-3):
-        if (stageProps.rootProps.cx < stageProps.meanProps.cx):
-            lphi = rootPhi
-            
-        else:
-            hphi = rootPhi
-            
-        rootPhi = (hphi + lphi) / 2
-        stageProps.rootProps = CalcStageBladeAngles(r = r, phi = rootPhi, psi = psi, rpm = rpm, radius = rootRadius)
-        
-    stageProps.meanProps.r = r
-    stageProps.meanProps.psi = psi
-    stageProps.meanProps.phi = rootPhi
-    
-    stageProps.tipProps = CalcStageBladeAngles(r = r, phi = phi, psi = psi, rpm = rpm, radius = tipRadius)
+    #Match Root and Tip Axial Velocity to the Mean Line
+    rootPhi, rootConverged = SolveStagePhi(cx = stageProps.meanProps.cx, rpm = rpm, radius = rootRadius)
+    tipPhi, tipConverged = SolveStagePhi(cx = stageProps.meanProps.cx, rpm = rpm, radius = tipRadius)
+    stageProps.converged = rootConverged and tipConverged
     
-    lphi = 1e-6
-    hphi = 2 - 1e-6
-    tipPhi = phi
+    stageProps.rootProps = CalcStageBladeAngles(r = r, phi = rootPhi, psi = psi, rpm = rpm, radius = rootRadius)
+    stageProps.rootProps.r = r
+    stageProps.rootProps.psi = psi
+    stageProps.rootProps.phi = rootPhi
     
-    while (abs(stageProps.meanProps.cx - stageProps.tipProps.cx) > 1e-3):
-        if (stageProps.tipProps.cx < stageProps.meanProps.cx):
-            lphi = tipPhi
-            
-        else:
-            hphi = tipPhi
-            
-        tipPhi = (hphi + lphi) / 2
-        stageProps.tipProps = CalcStageBladeAngles(r = r, phi = tipPhi, psi = psi, rpm = rpm, radius = tipRadius)
-    
-    stageProps.meanProps.r = r
-    stageProps.meanProps.psi = psi
-    stageProps.meanProps.phi = tipPhi
+    stageProps.tipProps = CalcStageBladeAngles(r = r, phi = tipPhi, psi = psi, rpm = rpm, radius = tipRadius)
+    stageProps.tipProps.r = r
+    stageProps.tipProps.psi = psi
+    stageProps.tipProps.phi = tipPhi
     
     return stageProps
-    
\ No newline at end of file
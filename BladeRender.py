@@ -1,23 +1,28 @@
 try:
     from PyQt4.QtGui import *
-    from matplotlib.backends.backend_qt4agg import FigureCanvasQTAgg as FigureCanvas
-    import matplotlib.pyplot as plt
-    from matplotlib.figure import Figure
     
 except ImportError:
-    import matplotlib
-    matplotlib.use("Qt5Agg")
-    import matplotlib.pyplot as plt
-    from PyQt5.QtCore import *
     from PyQt5.QtWidgets import *
-    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-    from matplotlib.figure import Figure
 
 from BladeCalc import *
 from StlUtils import *
-import numpy as np
+from CompGeom import *
+from MeshCache import CachedAssembly
+from CanvasPool import canvasPool
 
 
+#Most Triangles Drawn in the 3D Preview, matplotlib Sorts and Draws Every
+#Polygon in Python so Bigger Parts Are Decimated for Display. Exports Always
+#Use the Full Mesh. Can Be Changed
+PREVIEW_TRIANGLES = 10000
+
+#Blade Segments Root to Tip and Points per Blade Surface of Rendered and
+#Exported Parts. Raising Them Smooths the Export, the Preview Stays Under
+#PREVIEW_TRIANGLES. Can Be Changed
+BLADE_NSPAN = 1
+BLADE_NPTS = 24
+    
+    
 ################################
 ##Function: RenderRotor
 #Builds and Renders Rotor Object
@@ -25,15 +30,20 @@ import numpy as np
 #parent: parent (obj)
 #common: common properties (dict)
 #object: rotor properties (dict)
+#checked: if endwall was checked (bool)
+#build: calculate and render right away (bool), pass False
+#to run objCalc elsewhere (e.g. a worker thread) then call render
+#cache: components kept from earlier renders (ComponentCache)
+#meshCache: on disk cache of whole parts (MeshCache)
 ##Returns:
-#self.rotorHub: completed rotor obj to be exported
+#self.assembly: completed rotor obj to be exported
 ################################
 class RenderRotor(QWidget):
-    def __init__(self, parent, common, object, checked):
+    def __init__(self, parent, common, object, checked, build = True, cache = None, meshCache = None):
         super(RenderRotor, self).__init__(parent)
         
-        self.figure = Figure(figsize=(5, 5), dpi=100)
-        self.canvas = FigureCanvas(self.figure)
+        self.canvas = canvasPool.acquire('render', figsize = (5, 5), dpi = 100)
+        self.figure = self.canvas.figure
     
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
@@ -45,124 +55,53 @@ class RenderRotor(QWidget):
         
         #If Rotor Endwall Was Checked
         self.endWall = checked
+        self.cache = cache
+        self.meshCache = meshCache
         
         #Caculate Rotor Using...Math
-        self.objCalc()
+        if build:
+            self.objCalc()
+            self.render()
     
     
-    def objCalc(self):
-        #Create Rotor Object
-        self.stageProps = StageCalc(r = self.commonVars['Reaction (R)'], 
-                                                phi = self.commonVars['Flow (Phi)'], 
-                                                psi = self.commonVars['Loading (Psi)'], 
-                                                rpm = self.commonVars['RPM'], 
-                                                rootRadius = self.rotorVars['Hub Diameter'] / 2, 
-                                                tipRadius = self.rotorVars['Rotor Diameter'] / 2)
-        #Rotor Root Properties
-        rotorRoot = self.stageProps.rootProps
-        avgBetaRoot = (rotorRoot.beta2 + rotorRoot.beta1) / 2
-        deltaBetaRoot = rotorRoot.beta2 - rotorRoot.beta1
-        rootCamber = (self.rotorVars['Root Chord (Rotor)'] /2 / np.sin(deltaBetaRoot) - self.rotorVars['Root Chord (Rotor)'] / 2 / np.tan(deltaBetaRoot)) / self.rotorVars['Root Chord (Rotor)']
-        rootCamber *= -1
-        
-        #Rotor Tip Properties
-        rotorTip = self.stageProps.tipProps
-        avgBetaTip = (rotorTip.beta2 + rotorTip.beta1) / 2
-        deltaBetaTip = rotorTip.beta2 - rotorTip.beta1
-        tipCamber = (self.rotorVars['Tip Chord (Rotor)'] /2 / np.sin(deltaBetaTip) - self.rotorVars['Tip Chord (Rotor)'] / 2 / np.tan(deltaBetaTip)) / self.rotorVars['Tip Chord (Rotor)']
-        tipCamber *= -1
-        
-        #Draw Hub Cylinder
-        self.rotorHub = drawCylinder(dia = self.rotorVars['Hub Diameter'],
-                                               height = self.rotorVars['Hub Length'])
-        #Hub Bounds
-        hminx, hmaxx, hminy, hmaxy, hminz, hmaxz = FindBounds(self.rotorHub)
-        #Rotate the Hub About the Y Axis 90 Deg
-        self.rotorHub.rotate([0, 1, 0], np.deg2rad(90))
-        #Move it Back to Center
-        self.rotorHub.x += (hmaxz - hminz) / 2
-        
-        rootAngle = np.rad2deg(avgBetaRoot)
-        
-        #Two different blade heights
-        #Relative is for posistioning, to make sure some of the blade is within the rotor hub
-        #It's the blade height that's exposed
-        relativeBladeHeight = (self.rotorVars['Rotor Diameter'] / 2 - self.rotorVars['Hub Diameter'] / 2)
-        #Actual height is the actual length of the blade that is created, not all is exposed
-        actualBladeHeight = (self.rotorVars['Rotor Diameter'] / 1.7 - self.rotorVars['Hub Diameter'] / 2) / np.cos(np.deg2rad(rootAngle))
-        
-        #Generate Blades
-        self.blades = []
-        for i in range(int(self.rotorVars['Num of Blade (Rotor)'])):
-            blade = drawBlade(camberRoot = rootCamber, 
-                                    camberTip = tipCamber, 
-                                    camberPos = 0.35, #Can Be Changed
-                                    thickness = self.rotorVars['Blade Thickness (Rotor)'] / 100, 
-                                    bladeHeight = actualBladeHeight, 
-                                    twistAngle = np.rad2deg(avgBetaRoot - avgBetaTip), 
-                                    rootChord = self.rotorVars['Root Chord (Rotor)'], 
-                                    tipChord = self.rotorVars['Tip Chord (Rotor)'], 
-                                    cot = [self.rotorVars['X Twist (Rotor)'], self.rotorVars['Y Twist (Rotor)']])
-
-            #Not used, but just in case, the rotation matrix
-            #R = rotationMatrix((0, 0, 1), np.deg2rad(rootAngle))
-
-            #Rotate, Move, and Rotate the Blade
-            blade.rotate([0, 0, 1], np.deg2rad(-rootAngle))
-            blade.y += (((hmaxx - hminx)) / 2) - (relativeBladeHeight / 2)
-            blade.z += (((hmaxy - hminy)) / 2) - (relativeBladeHeight / 2)
-            blade.rotate([1, 0, 0], np.deg2rad(rootAngle + ((360 / 10) * i)))
-            
-            self.blades.append(blade)       
+    ################################
+    ##Function: objCalc
+    #Builds the rotor mesh, touches no widgets so
+    #it is safe to run off the GUI thread
+    ##Inputs:
+    #progress: callback(percent, message), may raise
+    #RenderCancelled to stop the build
+    ##Returns:
+    #none
+    ################################
+    def objCalc(self, progress = noProgress):
+        self.assembly = CachedAssembly(self.meshCache, 'Rotor', self.commonVars, self.rotorVars, self.endWall, progress, self.cache, BLADE_NSPAN, BLADE_NPTS)
         
         #Create a Combined Mesh of All Objects
-        for blade in self.blades:
-            self.rotorHub = mesh.Mesh(np.concatenate([self.rotorHub.data, blade.data]))
-        
-        #If End Wall Was Checked
-        if self.endWall:
-            #Create EndWall Mesh
-            endWall = drawDuct(innerDia = self.rotorVars['Rotor Diameter'], thickness = 2, height = self.rotorVars['Hub Length'])
-            endWall.rotate([0, 1, 0], np.deg2rad(90))
-            endWall.x += (hmaxz - hminz) / 2
-            self.rotorHub = mesh.Mesh(np.concatenate([self.rotorHub.data, endWall.data]))
-        
-        tminx, tmaxx, tminy, tmaxy, tminz, tmaxz = FindBounds(self.rotorHub)
-        
-        #print(tmaxz - tminz)
-        #print(tmaxx - tminx)
-        #print(tmaxy - tminy)
+        self.rotorHub = self.assembly.build()
         
-        #Render That Shiz
-        self.render()
+        #Reduced Copy for the Preview
+        self.preview = decimateMesh(self.rotorHub, PREVIEW_TRIANGLES)
         
         
     def render(self):
-        from matplotlib import pyplot
-        from mpl_toolkits import mplot3d
-
         # Create a new plot
-        axes = mplot3d.Axes3D(self.figure)
-
-        # Render the Rotor
-        axes.add_collection3d(mplot3d.art3d.Poly3DCollection(self.rotorHub.vectors))
+        axes = meshAxes(self.figure)
 
-        # Auto scale to the mesh size
-        scale = self.rotorHub.points.flatten(-1)
-        axes.auto_scale_xyz(scale, scale, scale)
-        
-        xLabel = axes.set_xlabel('X')
-        yLabel = axes.set_ylabel('Y')
-        zLabel = axes.set_zlabel('Z')
-        axes.set_xticklabels([])
-        axes.set_yticklabels([])
-        axes.set_zticklabels([])
-        #pyplot.show()
+        # Render the Preview, Scaled to the Full Mesh
+        plotMesh(axes, self.rotorHub, self.preview)
         self.canvas.draw()
         
         
     def getObj(self):
-        return self.rotorHub
+        return self.assembly
+        
+        
+    #Hand the Canvas Back to the Pool
+    def release(self):
+        if self.canvas is not None:
+            canvasPool.release(self.canvas)
+            self.canvas = None
         
 ################################
 ##Function: RenderStator
@@ -171,15 +110,19 @@ class RenderRotor(QWidget):
 #parent: parent (obj)
 #common: common properties (dict)
 #object: stator properties (dict)
+#build: calculate and render right away (bool), pass False
+#to run objCalc elsewhere (e.g. a worker thread) then call render
+#cache: components kept from earlier renders (ComponentCache)
+#meshCache: on disk cache of whole parts (MeshCache)
 ##Returns:
-#self.statorHub: completed stator obj to be exported
+#self.assembly: completed stator obj to be exported
 ################################
 class RenderStator(QWidget):
-    def __init__(self, parent, common, object):
+    def __init__(self, parent, common, object, build = True, cache = None, meshCache = None):
         super(RenderStator, self).__init__(parent)
         
-        self.figure = Figure(figsize=(5, 5), dpi=100)
-        self.canvas = FigureCanvas(self.figure)
+        self.canvas = canvasPool.acquire('render', figsize = (5, 5), dpi = 100)
+        self.figure = self.canvas.figure
     
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
@@ -188,129 +131,51 @@ class RenderStator(QWidget):
         #Change Strings to Floats in Dicts
         self.commonVars = {k : float(v) for k, v in common.items()}
         self.statorVars = {k : float(v) for k, v in object.items()}
+        self.cache = cache
+        self.meshCache = meshCache
 
         #Caculate Stator 
-        self.objCalc()
-        
-        
-    def objCalc(self):
-        #Create Stator Object
-        self.stageProps = StageCalc(r = self.commonVars['Reaction (R)'], 
-                                                phi = self.commonVars['Flow (Phi)'], 
-                                                psi = self.commonVars['Loading (Psi)'], 
-                                                rpm = self.commonVars['RPM'], 
-                                                rootRadius = self.statorVars['Mount Can Dia'] / 2, 
-                                                tipRadius = self.statorVars['Duct ID'] / 2)
-        #Stator Root Properties
-        rotorRoot = self.stageProps.rootProps
-        avgBetaRoot = (rotorRoot.beta2 + rotorRoot.beta1) / 2
-        deltaBetaRoot = rotorRoot.beta2 - rotorRoot.beta1
-        rootCamber = (self.statorVars['Root Chord (Stator)'] /2 / np.sin(deltaBetaRoot) - self.statorVars['Root Chord (Stator)'] / 2 / np.tan(deltaBetaRoot)) / self.statorVars['Root Chord (Stator)']
-        rootCamber *= -1
-        
-        #Stator Tip Properties
-        rotorTip = self.stageProps.tipProps
-        avgBetaTip = (rotorTip.beta2 + rotorTip.beta1) / 2
-        deltaBetaTip = rotorTip.beta2 - rotorTip.beta1
-        tipCamber = (self.statorVars['Tip Chord (Stator)'] /2 / np.sin(deltaBetaTip) - self.statorVars['Tip Chord (Stator)'] / 2 / np.tan(deltaBetaTip)) / self.statorVars['Tip Chord (Stator)']
-        tipCamber *= -1
-            
-        #Draw Hub Cylinder
-        self.mountCan = drawCylinder(dia = self.statorVars['Mount Can Dia'],
-                                                    height = self.statorVars['Mount Can Length'])
+        if build:
+            self.objCalc()
+            self.render()
+        
+        
+    ################################
+    ##Function: objCalc
+    #Builds the stator mesh, touches no widgets so
+    #it is safe to run off the GUI thread
+    ##Inputs:
+    #progress: callback(percent, message), may raise
+    #RenderCancelled to stop the build
+    ##Returns:
+    #none
+    ################################
+    def objCalc(self, progress = noProgress):
+        self.assembly = CachedAssembly(self.meshCache, 'Stator', self.commonVars, self.statorVars, False, progress, self.cache, BLADE_NSPAN, BLADE_NPTS)
         
-        #Hub Bounds
-        hminx, hmaxx, hminy, hmaxy, hminz, hmaxz = FindBounds(self.mountCan)
-        #Rotate the Hub About the Y Axis 90 Deg
-        self.mountCan.rotate([0, 1, 0], np.deg2rad(90))
-        #Move Can to Specified Location
-        self.mountCan.x += (hmaxz - hminz) / 2  + self.statorVars['Mount Can Loc']
-        
-        #Draw and Transform the Duct
-        duct = drawDuct(innerDia = self.statorVars['Duct ID'],
-                                        thickness = self.statorVars['Duct Thickness'],
-                                        height = self.statorVars['Duct Length'])
-                                        
-        duct.rotate([0, 1, 0], np.deg2rad(90))
-        #Move to Center
-        duct.x += ((hmaxz - hminz) / 2)
-        
-        rootAngle = np.rad2deg(avgBetaRoot)
-        
-        #Two different blade heights
-        #Relative is for posistioning, to make sure some of the blade is within the rotor hub
-        #It's the blade height that's exposed
-        relativeBladeHeight = (self.statorVars['Duct ID'] / 2 - self.statorVars['Mount Can Dia'] / 2)
-        #Actual height is the actual length of the blade that is created, not all is exposed
-        actualBladeHeight = (self.statorVars['Duct ID'] / 1.7 - self.statorVars['Mount Can Dia'] / 2) / np.cos(np.deg2rad(rootAngle))
+        #Create a Combined Mesh of All Objects
+        self.mountCan = self.assembly.build()
         
-        #Generate Blades
-        blades = []
-        for i in range(int(self.statorVars['Num of Blade (Stator)'])):
-            blade = drawBlade(camberRoot = rootCamber, 
-                                    camberTip = tipCamber, 
-                                    camberPos = .35, #Can Be Changed
-                                    thickness = self.statorVars['Blade Thickness (Stator)'] / 100, 
-                                    bladeHeight = actualBladeHeight, 
-                                    twistAngle = np.rad2deg(avgBetaRoot - avgBetaTip), 
-                                    rootChord = self.statorVars['Root Chord (Stator)'], 
-                                    tipChord = self.statorVars['Tip Chord (Stator)'], 
-                                    cot = [self.statorVars['X Twist (Stator)'], self.statorVars['Y Twist (Stator)']])
-                                    
-            #Get Bounds for That Blade
-            minx, maxx, miny, maxy, minz, maxz = FindBounds(blade)
-            
-            #Rotate, Move, and Rotate the Blade
-            blade.rotate([0, 0, 1], np.deg2rad(-rootAngle))
-            blade.y += (((hmaxx - hminx)) / 2) - (relativeBladeHeight / 2)
-            blade.z += (((hmaxy - hminy)) / 2) - (relativeBladeHeight / 2)
-            blade.rotate([1, 0, 0], np.deg2rad(rootAngle + ((360 / 10) * i)))
-            
-            #Move to Specified Location
-            blade.x += self.statorVars['Mount Can Loc']
-            blades.append(blade) 
-    
-        #Join Blades and Mount Can
-        for blade in blades:
-            self.mountCan = mesh.Mesh(np.concatenate([self.mountCan.data, blade.data]))
-            
-        #Add Duct
-        self.mountCan = mesh.Mesh(np.concatenate([self.mountCan.data, duct.data]))
-            
-        #Render That 
-        self.render()
+        #Reduced Copy for the Preview
+        self.preview = decimateMesh(self.mountCan, PREVIEW_TRIANGLES)
         
         
     def render(self):
-        from matplotlib import pyplot
-        from mpl_toolkits import mplot3d
-
         # Create a new plot
-        axes = mplot3d.Axes3D(self.figure)
+        axes = meshAxes(self.figure)
 
-        # Render the Rotor
-        axes.add_collection3d(mplot3d.art3d.Poly3DCollection(self.mountCan.vectors))
-
-        # Auto scale to the mesh size
-        scale = self.mountCan.points.flatten(-1)
-        axes.auto_scale_xyz(scale, scale, scale)
-        
-        xLabel = axes.set_xlabel('X')
-        yLabel = axes.set_ylabel('Y')
-        zLabel = axes.set_zlabel('Z')
-        axes.set_xticklabels([])
-        axes.set_yticklabels([])
-        axes.set_zticklabels([])
-        #pyplot.show()
+        # Render the Preview, Scaled to the Full Mesh
+        plotMesh(axes, self.mountCan, self.preview)
         self.canvas.draw()
         
         
     def getObj(self):
-        return self.mountCan
+        return self.assembly
                 
                 
-    
-    
-    
-    
+    #Hand the Canvas Back to the Pool
+    def release(self):
+        if self.canvas is not None:
+            canvasPool.release(self.canvas)
+            self.canvas = None
     
\ No newline at end of file
@@ -0,0 +1,143 @@
+try:
+    from PyQt4.QtCore import *
+    from PyQt4.QtGui import *
+    from matplotlib.backends.backend_qt4agg import FigureCanvasQTAgg as FigureCanvas
+    
+except ImportError:
+    import matplotlib
+    matplotlib.use("Qt5Agg")
+    from PyQt5.QtCore import *
+    from PyQt5.QtWidgets import *
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+    
+from matplotlib.figure import Figure
+import os
+
+
+################################
+##Function: residentMemory
+#Resident memory of this process, for checking that
+#repeated plots and renders do not grow it
+##Inputs:
+#None
+##Returns:
+#bytes: resident set size (int), None if it can't be read
+################################
+def residentMemory():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+        
+    except ImportError:
+        pass
+        
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            
+    except (OSError, ValueError, AttributeError):
+        return None
+        
+        
+################################
+##Function: CanvasPool
+#Keeps matplotlib canvases for reuse, each panel kind
+#('profile', 'render') draws into a canvas taken from the
+#pool and hands it back when its widget goes away. The
+#figure is cleared, not rebuilt, between uses
+##Inputs:
+#keep: spare canvases kept per kind (int)
+##Returns:
+#None
+################################
+class CanvasPool(object):
+    def __init__(self, keep = 2):
+        self.keep = keep
+        self.free = {}
+        self.inUse = 0
+        self.created = 0
+        self.reused = 0
+        
+        
+    ################################
+    ##Function: acquire
+    #Takes a cleared canvas of the given kind from the
+    #pool, making one if none are spare
+    ##Inputs:
+    #kind: panel kind (str)
+    #figsize: figure size in inches, new canvases only (tuple)
+    #dpi: figure dpi, new canvases only (int)
+    ##Returns:
+    #canvas: canvas whose figure is canvas.figure (FigureCanvas)
+    ################################
+    def acquire(self, kind, figsize = (5, 5), dpi = 100):
+        spare = self.free.get(kind)
+        if spare:
+            canvas = spare.pop()
+            self.reused += 1
+            
+        else:
+            canvas = FigureCanvas(Figure(figsize = figsize, dpi = dpi))
+            canvas.poolKind = kind
+            self.created += 1
+            
+        self.inUse += 1
+        return canvas
+        
+        
+    ################################
+    ##Function: release
+    #Clears a canvas and takes it back, canvases past
+    #the number kept are deleted straight away
+    ##Inputs:
+    #canvas: canvas from acquire (FigureCanvas)
+    ##Returns:
+    #None
+    ################################
+    def release(self, canvas):
+        self.inUse -= 1
+        canvas.figure.clear()
+        canvas.setParent(None)
+        
+        spare = self.free.setdefault(canvas.poolKind, [])
+        if len(spare) < self.keep:
+            spare.append(canvas)
+        else:
+            canvas.deleteLater()
+            
+            
+    def stats(self):
+        return {'created' : self.created,
+                'reused' : self.reused,
+                'inUse' : self.inUse,
+                'spare' : sum(len(spare) for spare in self.free.values()),
+                'memory' : residentMemory()}
+                
+                
+#Shared by Every Plot and Render Widget
+canvasPool = CanvasPool()
+
+
+###USED FOR QUICK TESTING
+if __name__ == "__main__":
+    import sys
+    from BladePlot import NACA4Profile
+    from BladeRender import RenderRotor
+    from CanvasPool import canvasPool
+    app = QApplication(sys.argv)
+    rotor = {'Hub Diameter': '30.000', 'X Twist (Rotor)': '50.000', 'Blade Thickness (Rotor)': '16', 'Rotor Diameter': '60', 'Hub Length': '17', 'Blade Clearance': '0', 'Y Twist (Rotor)': '0.000', 'Root Chord (Rotor)': '20', 'Num of Blade (Rotor)': '24', 'Tip Chord (Rotor)': '10.88'}
+    common = {'Reaction (R)': '0.4', 'Mean Line Radius': '47.455', 'Flow (Phi)': '0.691', 'RPM': '30000', 'Loading (Psi)': '0.482'}
+    
+    #Plot and Render Over and Over, Memory Should Level Off After the First Few
+    for i in range(1, 201):
+        for widget in (NACA4Profile(None, common, rotor, 'R'), RenderRotor(None, common, rotor, False)):
+            if isinstance(widget, NACA4Profile):
+                widget.plotter()
+                
+            widget.release()
+            widget.deleteLater()
+            
+        app.sendPostedEvents(None, QEvent.DeferredDelete)
+        if i % 50 == 0:
+            print(i, canvasPool.stats())
+            
\ No newline at end of file
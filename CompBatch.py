@@ -0,0 +1,337 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from FileOps import StageOpen
+
+
+################################
+##Function: RunPool
+#Runs a function over every job on a process pool and
+#hands back each job with its result or the error it
+#raised, so one bad job never stops the rest. A worker
+#that dies breaks the pool for every job still pending,
+#those are run again one at a time in a pool of their own
+#and the rest go to a fresh pool. In job order at most two
+#jobs per worker are in flight, so finished results
+#waiting their turn never pile up
+##Inputs:
+#function: function run in the workers
+#jobs: argument tuples for function (list)
+#workers: worker processes, None for one per CPU (int)
+#ordered: hand back in job order instead of as finished (bool)
+##Returns:
+#(job, result, error): error is None on success (generator)
+################################
+def RunPool(function, jobs, workers = None, ordered = False):
+    pools = [ProcessPoolExecutor(max_workers = workers)]
+        
+    #A Broken Pool Takes No New Jobs, Start Another
+    def submit(job):
+        try:
+            return pools[-1].submit(function, *job)
+            
+        except BrokenProcessPool:
+            pools.append(ProcessPoolExecutor(max_workers = workers))
+            return pools[-1].submit(function, *job)
+            
+    if ordered:
+        futures = inOrder(jobs, submit, 2 * (workers or os.cpu_count() or 1))
+    else:
+        submitted = {submit(job) : job for job in jobs}
+        futures = ((submitted[future], future) for future in as_completed(submitted))
+        
+    try:
+        for job, future in futures:
+            try:
+                yield job, future.result(), None
+                
+            except BrokenProcessPool:
+                yield (job,) + runAlone(function, job)
+                
+            except Exception as error:
+                yield job, None, error
+                
+    finally:
+        futures.close()
+        for pool in pools:
+            pool.shutdown()
+            
+            
+#Submits Jobs Through submit Keeping at Most window in Flight, Yields (job, future) in Job Order
+def inOrder(jobs, submit, window):
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append((job, submit(job)))
+            if len(pending) >= window:
+                yield pending.popleft()
+                
+        while pending:
+            yield pending.popleft()
+            
+    #Stopped Early, Don't Run What Is Still Queued
+    finally:
+        for job, future in pending:
+            future.cancel()
+                
+                
+#Runs One Job in a Fresh Single Worker Pool, Returns (result, error)
+def runAlone(function, job):
+    try:
+        with ProcessPoolExecutor(max_workers = 1) as pool:
+            return pool.submit(function, *job).result(), None
+            
+    except Exception as error:
+        return None, error
+
+
+################################
+##Function: BuildPart
+#Builds one rotor or stator and streams it to disk,
+#runs inside a worker process
+##Inputs:
+#path: output .stl path (str)
+#part: 'Rotor' or 'Stator' (str)
+#common: common properties (dict)
+#object: rotor or stator properties (dict)
+#endWall: add the rotor support wall (bool)
+#meshCache: on disk cache of built parts (MeshCache) or None
+#nspan, npts: blade resolution, see CompGeom.BuildRotor (ints)
+##Returns:
+#(path, triangles, seconds): written file, triangle count, build time
+################################
+def BuildPart(path, part, common, object, endWall = False, meshCache = None, nspan = 1, npts = 24):
+    from MeshCache import CachedAssembly
+    
+    start = time.time()
+    assembly = CachedAssembly(meshCache, part, common, object, endWall, nspan = nspan, npts = npts)
+    assembly.save(path)
+    
+    return path, len(assembly), time.time() - start
+    
+    
+################################
+##Function: BuildMesh
+#Builds one rotor or stator and hands the mesh back,
+#runs inside a worker process
+##Inputs:
+#part: 'Rotor' or 'Stator' (str)
+#common: common properties (dict)
+#object: rotor or stator properties (dict)
+#endWall: add the rotor support wall (bool)
+#meshCache: on disk cache of built parts (MeshCache) or None
+#nspan, npts: blade resolution, see CompGeom.BuildRotor (ints)
+##Returns:
+#(mesh, seconds): built part (IndexedMesh), build time
+################################
+def BuildMesh(part, common, object, endWall = False, meshCache = None, nspan = 1, npts = 24):
+    from MeshCache import CachedAssembly
+    
+    start = time.time()
+    mesh = CachedAssembly(meshCache, part, common, object, endWall, nspan = nspan, npts = npts).build()
+    
+    return mesh, time.time() - start
+    
+    
+################################
+##Function: StackParts
+#Builds every part across a process pool and places
+#them one after another along the axis, in stage order
+#rotor then stator. Parts are written as they arrive,
+#either into one combined STL or to their own files,
+#only a few built parts are held at a time. A part that
+#fails to build stops the stack as every later part
+#would be out of place, a combined STL is then removed
+##Inputs:
+#jobs: from StageJobs (list)
+#combined: path of the single STL, None for per part files (str)
+#gap: axial clearance between parts (float)
+#endWall: add the rotor support wall (bool)
+#meshCache: on disk cache of built parts (MeshCache) or None
+#workers: worker processes, None for one per CPU (int)
+#nspan, npts: blade resolution, see CompGeom.BuildRotor (ints)
+##Returns:
+#failed: number of parts that could not be built or written (int)
+################################
+def StackParts(jobs, combined = None, gap = 0, endWall = False, meshCache = None, workers = None, nspan = 1, npts = 24):
+    from StlUtils import IndexedMesh, StlWriter
+    
+    try:
+        writer = StlWriter(combined) if combined else None
+        
+    except OSError as error:
+        print('{}: failed ({})'.format(combined, error), file = sys.stderr)
+        return len(jobs)
+        
+    builds = [(part, common, object, endWall, meshCache, nspan, npts) for path, part, common, object in jobs]
+    results = RunPool(BuildMesh, builds, workers, ordered = True)
+    failed = 0
+    placed = 0
+    end = None
+    
+    try:
+        #Results Come Back in Job Order
+        for (path, part, common, object), (build, result, error) in zip(jobs, results):
+            if error is not None:
+                print('{}: failed ({})'.format(path, error), file = sys.stderr)
+                break
+                
+            #Start This Part Where the Last One Ended
+            mesh, seconds = result
+            low, high = mesh.bounds
+            offset = 0 if end is None else end + gap - low[0]
+            end = high[0] + offset
+            mesh = IndexedMesh(mesh.vertices + [offset, 0, 0], mesh.faces)
+            placed += 1
+            
+            if writer is None:
+                try:
+                    with StlWriter(path) as partWriter:
+                        partWriter.write(mesh)
+                        
+                except OSError as error:
+                    failed += 1
+                    print('{}: failed ({})'.format(path, error), file = sys.stderr)
+                    continue
+                    
+            else:
+                writer.write(mesh)
+                
+            print('{}: {} triangles in {:.2f}s at x = {:.3f}'.format(path, len(mesh), seconds, offset))
+            
+        results.close()
+        
+        #A Part Is Missing, Every Part After It Would Be Out of Place
+        if placed < len(jobs):
+            print('{}: stopped, {} of {} parts not stacked'.format(combined or 'stack', len(jobs) - placed, len(jobs)), file = sys.stderr)
+            if writer is not None:
+                writer.abort()
+                return len(jobs)
+                
+            return failed + len(jobs) - placed
+            
+        if writer is not None:
+            writer.close()
+            print('{}: {} triangles'.format(combined, writer.count))
+            
+    #The Combined File Is Useless Once a Write Fails, Don't Leave Part of It Behind
+    except OSError as error:
+        results.close()
+        if writer is not None:
+            writer.abort()
+            
+        print('{}: failed ({})'.format(combined or 'stack', error), file = sys.stderr)
+        return len(jobs)
+        
+    except BaseException:
+        results.close()
+        if writer is not None:
+            writer.abort()
+        raise
+            
+    return failed
+    
+    
+################################
+##Function: StageJobs
+#Lists the parts to build for every stage in a
+#compressor file
+##Inputs:
+#file: path to compressor .json (str)
+#outDir: output directory (str)
+#parts: parts to build, 'Rotor' and/or 'Stator' (list)
+##Returns:
+#jobs: (path, part, common, object) tuples (list)
+################################
+def StageJobs(file, outDir, parts):
+    jobs = []
+    for number, common, rotor, stator in StageOpen(file, numbered = True):
+        for part, object in (('Rotor', rotor), ('Stator', stator)):
+            if part in parts:
+                path = os.path.join(outDir, 'Stage_{}_{}.stl'.format(number, part))
+                jobs.append((path, part, common, object))
+                
+    return jobs
+    
+    
+################################
+##Function: main
+#Command line entry point, builds every stage of a
+#compressor file across a process pool
+##Inputs:
+#argv: command line arguments (list)
+##Returns:
+#status: exit code (int)
+################################
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Build STL files for every stage of a CompPy compressor file without the GUI.')
+    parser.add_argument('file', help = 'compressor .json saved by CompPy')
+    parser.add_argument('-o', '--out', default = '.', help = 'output directory (default: current directory)')
+    parser.add_argument('-j', '--jobs', type = int, default = None, help = 'worker processes (default: one per CPU)')
+    parser.add_argument('--parts', nargs = '+', choices = ['Rotor', 'Stator'], default = ['Rotor', 'Stator'], help = 'parts to build (default: both)')
+    parser.add_argument('--support-wall', action = 'store_true', help = 'add the support wall around every rotor')
+    parser.add_argument('--cache-dir', default = None, help = 'mesh cache directory (default: $COMPPY_CACHE or ~/.cache/CompPy/meshes)')
+    parser.add_argument('--no-cache', action = 'store_true', help = 'always rebuild, do not read or write the mesh cache')
+    parser.add_argument('--stack', action = 'store_true', help = 'place every part after the one before it along the axis, in stage order')
+    parser.add_argument('--combined', default = None, metavar = 'NAME', help = 'with --stack, write the whole compressor to this one STL in the output directory')
+    parser.add_argument('--gap', type = float, default = 0, help = 'with --stack, axial clearance between parts in mm (default: 0)')
+    parser.add_argument('--resolution', type = int, nargs = 2, default = [1, 24], metavar = ('NSPAN', 'NPTS'), help = 'blade segments root to tip and points per blade surface (default: 1 24)')
+    args = parser.parse_args(argv)
+    nspan, npts = args.resolution
+    
+    if nspan < 1 or npts < 2:
+        parser.error('--resolution needs NSPAN >= 1 and NPTS >= 2')
+    
+    if args.combined and not args.stack:
+        parser.error('--combined needs --stack')
+    
+    try:
+        if not os.path.isdir(args.out):
+            os.makedirs(args.out)
+        
+    except OSError as error:
+        print('{}: {}'.format(args.out, error.strerror), file = sys.stderr)
+        return 1
+        
+    try:
+        jobs = StageJobs(args.file, args.out, args.parts)
+        
+    except (OSError, ValueError, KeyError) as error:
+        print('{}: {}'.format(args.file, error), file = sys.stderr)
+        return 1
+        
+    meshCache = None
+    if not args.no_cache:
+        from MeshCache import MeshCache, CACHE_DIR
+        meshCache = MeshCache(args.cache_dir or CACHE_DIR)
+        
+    if args.stack:
+        combined = os.path.join(args.out, args.combined) if args.combined else None
+        failed = StackParts(jobs, combined, args.gap, args.support_wall, meshCache, args.jobs, nspan, npts)
+            
+        return 1 if failed else 0
+    
+    failed = 0
+    builds = [(path, part, common, object, args.support_wall, meshCache, nspan, npts) for path, part, common, object in jobs]
+        
+    for build, result, error in RunPool(BuildPart, builds, args.jobs):
+        if error is None:
+            path, triangles, seconds = result
+            print('{}: {} triangles in {:.2f}s'.format(path, triangles, seconds))
+                
+        #Incomplete Stages, Unwritable Output or a Lost Worker, Report Them and Carry On
+        else:
+            failed += 1
+            print('{}: failed ({})'.format(build[0], error), file = sys.stderr)
+                
+    return 1 if failed else 0
+    
+    
+if __name__ == '__main__':
+    sys.exit(main())
+    
\ No newline at end of file
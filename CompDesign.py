@@ -0,0 +1,240 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from BladeCalc import CalcStageBladeAnglesArray, StageCalcArray
+from CompGeom import BladeCamber
+from CompPerf import *
+from CompSweep import SWEEP_KEYS, parseGrid
+from FileOps import StageOpen, StageSave
+
+
+#Non Aerodynamic Fields (Chords, Lengths, Blade Counts...) Are Copied From This File's First Stage
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'CompressorParams.json')
+
+#Template Fields Scaled With Blade Height, the Rest Are Copied as Is
+SCALED_KEYS = ('Hub Length', 'Root Chord (Rotor)', 'Tip Chord (Rotor)',
+                'Duct Length', 'Mount Can Length', 'Root Chord (Stator)', 'Tip Chord (Stator)')
+                
+                
+################################
+##Function: StageGeometry
+#Lays out every stage of a repeating stage design that
+#meets the target, all stages share r, phi, psi, rpm and
+#the mean line radius and the annulus closes up as the
+#density rises
+##Inputs:
+#r, phi, psi, rpm: candidate stage inputs (arrays)
+#spec: targets and limits, see main (dict)
+##Returns:
+#geometry: per candidate arrays, hub and tip diameters
+#are (stages, n), plus 'feasible' and 'score' (dict)
+################################
+def StageGeometry(r, phi, psi, rpm, spec):
+    r, phi, psi, rpm = [np.asarray(a, dtype = np.float64) for a in np.broadcast_arrays(r, phi, psi, rpm)]
+    stages, dT0 = spec['stages'], spec['dT0']
+    if stages < 1:
+        raise ValueError('need at least one stage, got {}'.format(stages))
+    
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        #Loading Sets the Blade Speed, RPM Then Sets the Mean Line
+        u = np.sqrt(CP * dT0 / psi)
+        meanRadius = u / (2 * np.pi * rpm / 60) * 1000
+        mean = CalcStageBladeAnglesArray(r, phi, psi, rpm, meanRadius)
+        c1 = mean.cx / np.cos(mean.alpha1)
+        
+        feasible = (psi > 0) & (phi > 0) & (rpm > 0)
+        feasible &= np.cos(mean.beta1) / np.cos(mean.beta2) >= spec['deHaller']
+        
+        hubDia = np.empty((stages,) + r.shape)
+        tipDia = np.empty((stages,) + r.shape)
+        T0, P0 = spec['T01'], spec['P01']
+        
+        for k in range(stages):
+            #Annulus Height That Passes the Mass Flow at This Stage's Inlet Density
+            T, P, rho = StaticState(T0, P0, c1)
+            height = spec['mdot'] / (rho * mean.cx) / (2 * np.pi * meanRadius / 1000) * 1000
+            hubDia[k] = 2 * meanRadius - height
+            tipDia[k] = 2 * meanRadius + height
+            
+            ratio = hubDia[k] / tipDia[k]
+            feasible &= (T > 0) & (ratio >= spec['hubTipMin']) & (ratio <= spec['hubTipMax'])
+            
+            #Root and Tip Must Solve and Turn the Flow
+            stageProps = StageCalcArray(r, phi, psi, rpm, hubDia[k] / 2, tipDia[k] / 2)
+            rootCamber = BladeCamber(stageProps.rootProps, 1)[0]
+            tipCamber = BladeCamber(stageProps.tipProps, 1)[0]
+            feasible &= stageProps.converged & np.isfinite(rootCamber) & np.isfinite(tipCamber)
+            
+            #The First Rotor Tip Sees the Highest Relative Mach Number
+            if k == 0:
+                w1 = stageProps.tipProps.cx / np.cos(stageProps.tipProps.beta1)
+                tipMach = w1 / np.sqrt(GAMMA * R_AIR * T)
+                feasible &= tipMach <= spec['mach']
+                
+            P0 = P0 * StagePressureRatio(dT0, T0, spec['eta'])
+            T0 = T0 + dT0
+            
+    feasible &= np.isfinite(hubDia).all(axis = 0) & np.isfinite(tipDia).all(axis = 0)
+    
+    #Smallest Machine Wins
+    score = np.where(feasible, tipDia[0], np.inf)
+    
+    return {'r' : r, 'phi' : phi, 'psi' : psi, 'rpm' : rpm, 'meanRadius' : meanRadius,
+            'hubDia' : hubDia, 'tipDia' : tipDia, 'tipMach' : tipMach, 'feasible' : feasible, 'score' : score}
+            
+            
+################################
+##Function: DesignChunk
+#Evaluates one slice of the candidate grid, runs
+#inside a worker process
+##Inputs:
+#grids: SWEEP_KEYS -> 1d arrays of values (dict)
+#start, stop: flat candidate range (ints)
+#spec: targets and limits, see main (dict)
+##Returns:
+#(feasible, best): feasible candidates in the slice (int),
+#best candidate's (score, r, phi, psi, rpm) or None
+################################
+def DesignChunk(grids, start, stop, spec):
+    values = [np.asarray(grids[k], dtype = np.float64) for k in SWEEP_KEYS]
+    index = np.unravel_index(np.arange(start, stop), tuple(v.shape[0] for v in values))
+    geometry = StageGeometry(*[v[i] for v, i in zip(values, index)], spec = spec)
+    
+    feasible = int(geometry['feasible'].sum())
+    if not feasible:
+        return 0, None
+        
+    best = np.argmin(geometry['score'])
+    return feasible, tuple(float(geometry[k][best]) for k in ('score',) + SWEEP_KEYS)
+    
+    
+################################
+##Function: DesignStages
+#Turns the chosen candidate into StageSave dicts,
+#blade counts, thickness and twist come from the
+#template, chords and lengths scale with blade height
+##Inputs:
+#r, phi, psi, rpm: chosen stage inputs (floats)
+#spec: targets and limits, see main (dict)
+#template: (common, rotor, stator) of a template stage (tuple)
+##Returns:
+#(commons, rotors, stators): one dict per stage (lists)
+################################
+def DesignStages(r, phi, psi, rpm, spec, template):
+    geometry = StageGeometry(r, phi, psi, rpm, spec)
+    templateCommon, templateRotor, templateStator = template
+    templateHeight = (float(templateRotor['Rotor Diameter']) - float(templateRotor['Hub Diameter'])) / 2
+    
+    commons, rotors, stators = [], [], []
+    for k in range(spec['stages']):
+        hubDia, tipDia = float(geometry['hubDia'][k]), float(geometry['tipDia'][k])
+        scale = (tipDia - hubDia) / 2 / templateHeight
+        
+        rotor, stator = dict(templateRotor), dict(templateStator)
+        for dict_ in (rotor, stator):
+            for key in dict_:
+                if key in SCALED_KEYS:
+                    dict_[key] = round(float(dict_[key]) * scale, 3)
+                    
+        rotor['Hub Diameter'] = stator['Mount Can Dia'] = round(hubDia, 3)
+        rotor['Rotor Diameter'] = stator['Duct ID'] = round(tipDia, 3)
+        
+        commons.append({'Reaction (R)' : round(r, 4), 'Flow (Phi)' : round(phi, 4), 'Loading (Psi)' : round(psi, 4),
+                        'RPM' : round(rpm), 'Mean Line Radius' : round((hubDia + tipDia) / 4, 3)})
+        rotors.append(rotor)
+        stators.append(stator)
+        
+    return commons, rotors, stators
+    
+    
+################################
+##Function: stageCount
+#argparse type for the number of stages
+##Inputs:
+#text: command line value (str)
+##Returns:
+#stages: number of stages, at least 1 (int)
+################################
+def stageCount(text):
+    try:
+        stages = int(text)
+        
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a whole number of stages, got '{}'".format(text))
+        
+    if stages < 1:
+        raise argparse.ArgumentTypeError('need at least one stage, got {}'.format(stages))
+        
+    return stages
+    
+    
+################################
+##Function: main
+#Command line entry point, searches the stage inputs
+#across a process pool for the smallest repeating stage
+#compressor that meets a pressure ratio and mass flow
+##Inputs:
+#argv: command line arguments (list)
+##Returns:
+#status: exit code (int)
+################################
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Find stage parameters that meet a pressure ratio and mass flow, written as a CompPy compressor file.')
+    parser.add_argument('--pr', type = float, required = True, help = 'overall total pressure ratio')
+    parser.add_argument('--mdot', type = float, required = True, help = 'mass flow, kg/s')
+    parser.add_argument('--stages', type = stageCount, required = True, help = 'number of stages')
+    parser.add_argument('--t01', type = float, default = T_STD, help = 'inlet total temperature, K (default: 288.15)')
+    parser.add_argument('--p01', type = float, default = P_STD, help = 'inlet total pressure, Pa (default: 101325)')
+    parser.add_argument('--eta', type = float, default = 0.85, help = 'stage isentropic efficiency (default: 0.85)')
+    parser.add_argument('--r', type = parseGrid, default = parseGrid('0.4:0.7:31'), help = "reaction grid, 'start:stop:num' or 'a,b,c' (default: 0.4:0.7:31)")
+    parser.add_argument('--phi', type = parseGrid, default = parseGrid('0.3:0.9:61'), help = 'flow coefficient grid (default: 0.3:0.9:61)')
+    parser.add_argument('--psi', type = parseGrid, default = parseGrid('0.2:0.6:41'), help = 'loading coefficient grid (default: 0.2:0.6:41)')
+    parser.add_argument('--rpm', type = parseGrid, default = parseGrid('10000:100000:91'), help = 'RPM grid (default: 10000:100000:91)')
+    parser.add_argument('--hub-tip', type = float, nargs = 2, default = [0.35, 0.9], metavar = ('MIN', 'MAX'), help = 'allowed hub to tip diameter ratio (default: 0.35 0.9)')
+    parser.add_argument('--de-haller', type = float, default = 0.72, help = 'lowest allowed mean line w2 / w1 (default: 0.72)')
+    parser.add_argument('--mach', type = float, default = 1.0, help = 'highest allowed first rotor tip relative Mach number (default: 1.0)')
+    parser.add_argument('--template', default = TEMPLATE, help = 'compressor file whose first stage supplies chords, lengths and blade counts')
+    parser.add_argument('-j', '--jobs', type = int, default = None, help = 'worker processes (default: one per CPU)')
+    parser.add_argument('-o', '--out', default = 'design.json', help = 'output compressor file (default: design.json)')
+    args = parser.parse_args(argv)
+    
+    spec = {'stages' : args.stages, 'mdot' : args.mdot, 'T01' : args.t01, 'P01' : args.p01, 'eta' : args.eta,
+            'hubTipMin' : args.hub_tip[0], 'hubTipMax' : args.hub_tip[1], 'deHaller' : args.de_haller, 'mach' : args.mach}
+    spec['dT0'] = float(StageWork(args.pr, args.stages, args.t01, args.eta))
+    
+    grids = {'r' : args.r, 'phi' : args.phi, 'psi' : args.psi, 'rpm' : args.rpm}
+    total = int(np.prod([grids[k].shape[0] for k in SWEEP_KEYS]))
+    chunk = 1 << 18
+    
+    start = time.time()
+    with ProcessPoolExecutor(max_workers = args.jobs) as pool:
+        results = list(pool.map(DesignChunk, *zip(*[(grids, first, min(first + chunk, total), spec) for first in range(0, total, chunk)])))
+        
+    feasible = sum(count for count, best in results)
+    candidates = [best for count, best in results if best is not None]
+    print('{} of {} candidates feasible, {:.2f}s'.format(feasible, total, time.time() - start))
+    
+    if not candidates:
+        print('No design meets the target, widen the grids or relax the limits', file = sys.stderr)
+        return 1
+        
+    score, r, phi, psi, rpm = min(candidates)
+    commons, rotors, stators = DesignStages(r, phi, psi, rpm, spec, next(StageOpen(args.template)))
+    StageSave(args.out, commons, rotors, stators)
+    
+    print('R = {:.4f}, phi = {:.4f}, psi = {:.4f}, RPM = {:.0f}, dT0 = {:.2f} K per stage'.format(r, phi, psi, rpm, spec['dT0']))
+    for i, (rotor, common) in enumerate(zip(rotors, commons), 1):
+        print('Stage {}: hub {:.3f} mm, tip {:.3f} mm'.format(i, rotor['Hub Diameter'], rotor['Rotor Diameter']))
+        
+    print(args.out)
+    
+    return 0
+    
+    
+if __name__ == '__main__':
+    sys.exit(main())
+    
\ No newline at end of file
@@ -0,0 +1,503 @@
+from functools import lru_cache
+from BladeCalc import *
+from StlUtils import *
+import numpy as np
+
+
+################################
+##Function: RenderCancelled
+#Raised from a progress callback to abandon
+#a build that is no longer wanted
+##Inputs:
+#None
+##Returns:
+#None
+################################
+class RenderCancelled(Exception):
+    pass
+    
+    
+################################
+##Function: noProgress
+#Default progress callback, does nothing
+##Inputs:
+#percent: percent complete (int)
+#message: current step (str)
+##Returns:
+#None
+################################
+def noProgress(percent, message):
+    pass
+    
+    
+#Bump Whenever a Change Here Alters the Meshes Built, Cached Meshes Are Keyed on It
+GEOMETRY_VERSION = 2
+    
+    
+#Dict Keys for Each Part: Root Radius, Tip Radius, Root Chord, Tip Chord
+PART_KEYS = {'Rotor' : ('Hub Diameter', 'Rotor Diameter', 'Root Chord (Rotor)', 'Tip Chord (Rotor)'),
+                'Stator' : ('Mount Can Dia', 'Duct ID', 'Root Chord (Stator)', 'Tip Chord (Stator)')}
+    
+    
+################################
+##Function: partName
+#Normalises the part flag used around the GUI
+##Inputs:
+#stage: 'R', 'Rotor', 'S' or 'Stator' (str)
+##Returns:
+#part: 'Rotor' or 'Stator' (str)
+################################
+def partName(stage):
+    return 'Rotor' if stage in ('R', 'Rotor') else 'Stator'
+    
+    
+#Common Properties the Velocity Triangles Read
+COMMON_KEYS = ('Reaction (R)', 'Flow (Phi)', 'Loading (Psi)', 'RPM')
+
+#Properties Each Component Is Built From, Blades Also Depend on COMMON_KEYS
+ROTOR_DEPS = {'Hub' : ('Hub Diameter', 'Hub Length'),
+                'Blades' : ('Hub Diameter', 'Rotor Diameter', 'Blade Thickness (Rotor)', 'Root Chord (Rotor)', 'Tip Chord (Rotor)',
+                            'X Twist (Rotor)', 'Y Twist (Rotor)', 'Num of Blade (Rotor)'),
+                'End Wall' : ('Rotor Diameter', 'Hub Length')}
+                
+#The Duct Is Centred on the Mount Can So It Follows the Can's Length Too
+STATOR_DEPS = {'Mount Can' : ('Mount Can Dia', 'Mount Can Length', 'Mount Can Loc'),
+                'Duct' : ('Duct ID', 'Duct Thickness', 'Duct Length', 'Mount Can Length'),
+                'Blades' : ('Mount Can Dia', 'Duct ID', 'Blade Thickness (Stator)', 'Root Chord (Stator)', 'Tip Chord (Stator)',
+                            'X Twist (Stator)', 'Y Twist (Stator)', 'Num of Blade (Stator)', 'Mount Can Loc')}
+                            
+                            
+################################
+##Function: ComponentCache
+#Keeps the last build of each component along with the
+#inputs it was built from, so a rebuild only redoes the
+#components whose inputs changed. Cached meshes are shared,
+#they must not be moved once built
+##Inputs:
+#None
+##Returns:
+#None
+################################
+class ComponentCache(object):
+    def __init__(self):
+        self.parts = {}
+        self.hits = 0
+        self.misses = 0
+        
+        
+    ################################
+    ##Function: get
+    #Returns the cached component if its inputs match,
+    #otherwise builds and stores it
+    ##Inputs:
+    #name: component name (str)
+    #inputs: values the component is built from (tuple)
+    #build: builds the component (callable)
+    ##Returns:
+    #component: whatever build returned
+    ################################
+    def get(self, name, inputs, build):
+        entry = self.parts.get(name)
+        if entry is not None and entry[0] == inputs:
+            self.hits += 1
+            return entry[1]
+            
+        self.misses += 1
+        component = build()
+        self.parts[name] = (inputs, component)
+        
+        return component
+        
+        
+    def clear(self):
+        self.parts.clear()
+        
+        
+################################
+##Function: depends
+#Input values a component is built from
+##Inputs:
+#vars: properties (dict of floats)
+#keys: properties the component reads (tuple)
+##Returns:
+#inputs: the values in key order (tuple)
+################################
+def depends(vars, keys):
+    return tuple(vars[k] for k in keys)
+    
+    
+################################
+##Function: BladeCamber
+#Camber of a blade section from its inlet and
+#outlet relative flow angles
+##Inputs:
+#props: stage properties at the section (object)
+#chord: section chord (float)
+##Returns:
+#(camber, avgBeta): section camber and mean blade angle (floats)
+################################
+def BladeCamber(props, chord):
+    avgBeta = (props.beta2 + props.beta1) / 2
+    deltaBeta = props.beta2 - props.beta1
+    camber = (chord / 2 / np.sin(deltaBeta) - chord / 2 / np.tan(deltaBeta)) / chord
+    
+    return -camber, avgBeta
+    
+    
+#Significant Digits Kept When Keying the Stage Cache
+STAGE_DIGITS = 12
+
+
+################################
+##Function: quantize
+#Rounds a float input to STAGE_DIGITS significant
+#digits so values that only differ by float noise
+#share a cache entry
+##Inputs:
+#value: input value (float)
+##Returns:
+#value: rounded value (float)
+################################
+def quantize(value):
+    return float('{:.{}g}'.format(float(value), STAGE_DIGITS))
+    
+    
+################################
+##Function: stageBladeCalc
+#Velocity triangles and root/tip camber, memoized as
+#the same stage is evaluated over and over by the
+#profile plot, the renders and the export
+##Inputs:
+#r, phi, psi, rpm: common properties (floats)
+#rootRadius, tipRadius: blade radii (floats)
+#rootChord, tipChord: blade chords (floats)
+##Returns:
+#(stageProps, rootCamber, tipCamber, avgBetaRoot, avgBetaTip),
+#shared between callers so stageProps must not be modified
+################################
+@lru_cache(maxsize = 256)
+def stageBladeCalc(r, phi, psi, rpm, rootRadius, tipRadius, rootChord, tipChord):
+    stageProps = StageCalc(r = r,
+                                phi = phi,
+                                psi = psi,
+                                rpm = rpm,
+                                rootRadius = rootRadius,
+                                tipRadius = tipRadius)
+    
+    rootCamber, avgBetaRoot = BladeCamber(stageProps.rootProps, rootChord)
+    tipCamber, avgBetaTip = BladeCamber(stageProps.tipProps, tipChord)
+    
+    return stageProps, rootCamber, tipCamber, avgBetaRoot, avgBetaTip
+    
+    
+################################
+##Function: StageBlade
+#Velocity triangles and root/tip camber for a rotor
+#or stator, StageBlade.cache_info() gives the hits and
+#misses of the memoized calculation
+##Inputs:
+#common: common properties (dict of floats)
+#object: rotor or stator properties (dict of floats)
+#stage: 'R', 'Rotor', 'S' or 'Stator' (str)
+##Returns:
+#(stageProps, rootCamber, tipCamber, avgBetaRoot, avgBetaTip),
+#raises ValueError if the root or tip can't be matched to
+#the mean line rather than building NaN geometry
+################################
+def StageBlade(common, object, stage):
+    rootKey, tipKey, rootChordKey, tipChordKey = PART_KEYS[partName(stage)]
+    
+    blade = stageBladeCalc(quantize(common['Reaction (R)']),
+                            quantize(common['Flow (Phi)']),
+                            quantize(common['Loading (Psi)']),
+                            quantize(common['RPM']),
+                            quantize(object[rootKey] / 2),
+                            quantize(object[tipKey] / 2),
+                            quantize(object[rootChordKey]),
+                            quantize(object[tipChordKey]))
+                            
+    if not blade[0].converged:
+        raise ValueError("{} root or tip can't be matched to the mean line, check '{}' and '{}'".format(partName(stage), rootKey, tipKey))
+        
+    return blade
+    
+StageBlade.cache_info = stageBladeCalc.cache_info
+StageBlade.cache_clear = stageBladeCalc.cache_clear
+    
+    
+################################
+##Function: NACA4Section
+#NACA 4 digit section along given chord stations
+##Inputs:
+#x: chord stations (array)
+#camber: maximum camber (float)
+#chord: chord length (float)
+#thickness: maximum thickness (float)
+#cpos: posistion of maximum camber (float)
+##Returns:
+#(upper, lower, camberLine): (x, y) arrays for each surface
+#and the camber line y array
+################################
+def NACA4Section(x, camber, chord, thickness, cpos):
+    fore = (x >= 0) & (x <= (chord * cpos))
+    camberLine = np.where(fore,
+                            camber * (x / np.power(cpos, 2)) * (2.0 * cpos - (x / chord)),
+                            camber * ((chord - x) / np.power(1 - cpos, 2)) * (1.0 + (x / chord) - 2.0 * cpos))
+    dycdx = np.where(fore,
+                        ((2.0 * camber) / np.power(cpos, 2)) * (cpos - x / chord),
+                        ((2.0 * camber) / np.power(1 - cpos, 2)) * (cpos - x / chord))
+    yt = 5 * thickness * chord * ((0.2969 * (np.sqrt(x / chord))) + (-0.1260 * (x / chord)) + (-0.3516 * np.power(x / chord, 2)) + (0.2843 * np.power(x /chord, 3)) + (-0.1015 * np.power(x / chord, 4)))
+    
+    th = np.arctan(dycdx)
+    return ((x - yt * np.sin(th), camberLine + yt * np.cos(th)),
+                (x + yt * np.sin(th), camberLine - yt * np.cos(th)),
+                camberLine)
+                
+                
+################################
+##Function: BladeProfiles
+#Root and tip profile arrays for a rotor or stator,
+#the numbers behind the Draw Blade Profile plot
+##Inputs:
+#common: common properties (dict)
+#object: rotor or stator properties (dict)
+#stage: 'R', 'Rotor', 'S' or 'Stator' (str)
+#npts: chord stations (int)
+##Returns:
+#profiles: {'x', 'root', 'tip'}, root and tip hold
+#NACA4Section output (dict)
+################################
+def BladeProfiles(common, object, stage, npts = 200):
+    commonVars = {k : float(v) for k, v in common.items()}
+    objectVars = {k : float(v) for k, v in object.items()}
+    part = partName(stage)
+    
+    stageProps, rootCamber, tipCamber, avgBetaRoot, avgBetaTip = StageBlade(commonVars, objectVars, part)
+    thickness = objectVars['Blade Thickness ({})'.format(part)] / 100
+    x = np.linspace(0, 1, npts)
+    
+    return {'x' : x,
+            'root' : NACA4Section(x, camber = rootCamber, chord = 1, thickness = thickness, cpos = 0.35), #Can Be Changed
+            'tip' : NACA4Section(x, camber = tipCamber, chord = 1, thickness = thickness, cpos = 0.35)} #Can Be Changed
+            
+            
+################################
+##Function: BuildRotor
+#Builds the rotor geometry without touching Qt or
+#matplotlib, safe for worker threads and processes
+##Inputs:
+#common: common properties (dict)
+#rotor: rotor properties (dict)
+#endWall: add the support wall (bool)
+#progress: callback(percent, message), may raise
+#RenderCancelled to stop the build
+#cache: reuse components whose inputs have not
+#changed since the last build (ComponentCache)
+#nspan: spanwise blade segments (int)
+#npts: chordwise points per blade surface (int)
+##Returns:
+#assembly: rotor components (AssemblyBuilder)
+################################
+def BuildRotor(common, rotor, endWall = False, progress = noProgress, cache = None, nspan = 1, npts = 24):
+    #Change Strings to Floats in Dicts
+    commonVars = {k : float(v) for k, v in common.items()}
+    rotorVars = {k : float(v) for k, v in rotor.items()}
+    
+    if cache is None:
+        cache = ComponentCache()
+        
+    progress(0, 'Stage')
+    
+    progress(10, 'Hub')
+    
+    def buildHub():
+        #Draw Hub Cylinder
+        rotorHub = drawCylinder(dia = rotorVars['Hub Diameter'],
+                                               height = rotorVars['Hub Length'])
+        #Hub Bounds
+        bounds = FindBounds(rotorHub)
+        hminx, hmaxx, hminy, hmaxy, hminz, hmaxz = bounds
+        #Rotate the Hub About the Y Axis 90 Deg
+        rotorHub.rotate([0, 1, 0], np.deg2rad(90))
+        #Move it Back to Center
+        rotorHub.translate([(hmaxz - hminz) / 2, 0, 0])
+    
+        return rotorHub, bounds
+    
+    rotorHub, (hminx, hmaxx, hminy, hmaxy, hminz, hmaxz) = cache.get('Hub', depends(rotorVars, ROTOR_DEPS['Hub']), buildHub)
+    
+    progress(30, 'Blades')
+    
+    def buildBlades():
+        #Rotor Blade Angles and Camber
+        stageProps, rootCamber, tipCamber, avgBetaRoot, avgBetaTip = StageBlade(commonVars, rotorVars, 'Rotor')
+                            
+        rootAngle = np.rad2deg(avgBetaRoot)
+    
+        #Two different blade heights
+        #Relative is for posistioning, to make sure some of the blade is within the rotor hub
+        #It's the blade height that's exposed
+        relativeBladeHeight = (rotorVars['Rotor Diameter'] / 2 - rotorVars['Hub Diameter'] / 2)
+        #Actual height is the actual length of the blade that is created, not all is exposed
+        actualBladeHeight = (rotorVars['Rotor Diameter'] / 1.7 - rotorVars['Hub Diameter'] / 2) / np.cos(np.deg2rad(rootAngle))
+    
+        #Generate Blade Template
+        blade = drawBlade(camberRoot = rootCamber,
+                                camberTip = tipCamber,
+                                camberPos = 0.35, #Can Be Changed
+                                thickness = rotorVars['Blade Thickness (Rotor)'] / 100,
+                                bladeHeight = actualBladeHeight,
+                                twistAngle = np.rad2deg(avgBetaRoot - avgBetaTip),
+                                rootChord = rotorVars['Root Chord (Rotor)'],
+                                tipChord = rotorVars['Tip Chord (Rotor)'],
+                                cot = [rotorVars['X Twist (Rotor)'], rotorVars['Y Twist (Rotor)']],
+                                nspan = nspan,
+                                npts = npts)
+                                
+        #Rotate and Move the Template Blade
+        blade.rotate([0, 0, 1], np.deg2rad(-rootAngle))
+        blade.translate([0, (((hmaxx - hminx)) / 2) - (relativeBladeHeight / 2), (((hmaxy - hminy)) / 2) - (relativeBladeHeight / 2)])
+        
+        progress(50, 'Pattern')
+        
+        #Pattern the Template Around the Hub
+        numBlades = int(rotorVars['Num of Blade (Rotor)'])
+        return patternBlade(blade, np.deg2rad(rootAngle + ((360 / 10) * np.arange(numBlades))))
+        
+    blades = cache.get('Blades', depends(commonVars, COMMON_KEYS) + depends(rotorVars, ROTOR_DEPS['Blades']) + (nspan, npts), buildBlades)
+    
+    progress(70, 'Assembly')
+    
+    #Collect All Objects for the Combined Mesh
+    assembly = AssemblyBuilder().add(rotorHub).add(blades)
+    
+    #If End Wall Was Checked
+    if endWall:
+        def buildWall():
+            #Create EndWall Mesh
+            wall = drawDuct(innerDia = rotorVars['Rotor Diameter'], thickness = 2, height = rotorVars['Hub Length'])
+            wall.rotate([0, 1, 0], np.deg2rad(90))
+            wall.translate([(hmaxz - hminz) / 2, 0, 0])
+            
+            return wall
+            
+        assembly.add(cache.get('End Wall', depends(rotorVars, ROTOR_DEPS['End Wall']), buildWall))
+        
+    progress(100, 'Done')
+    
+    return assembly
+    
+    
+################################
+##Function: BuildStator
+#Builds the stator geometry without touching Qt or
+#matplotlib, safe for worker threads and processes
+##Inputs:
+#common: common properties (dict)
+#stator: stator properties (dict)
+#progress: callback(percent, message), may raise
+#RenderCancelled to stop the build
+#cache: reuse components whose inputs have not
+#changed since the last build (ComponentCache)
+#nspan: spanwise blade segments (int)
+#npts: chordwise points per blade surface (int)
+##Returns:
+#assembly: stator components (AssemblyBuilder)
+################################
+def BuildStator(common, stator, progress = noProgress, cache = None, nspan = 1, npts = 24):
+    #Change Strings to Floats in Dicts
+    commonVars = {k : float(v) for k, v in common.items()}
+    statorVars = {k : float(v) for k, v in stator.items()}
+    
+    if cache is None:
+        cache = ComponentCache()
+        
+    progress(0, 'Stage')
+    
+    progress(10, 'Mount Can')
+    
+    def buildMountCan():
+        #Draw Hub Cylinder
+        mountCan = drawCylinder(dia = statorVars['Mount Can Dia'],
+                                                    height = statorVars['Mount Can Length'])
+                                                
+        #Hub Bounds
+        bounds = FindBounds(mountCan)
+        hminx, hmaxx, hminy, hmaxy, hminz, hmaxz = bounds
+        #Rotate the Hub About the Y Axis 90 Deg
+        mountCan.rotate([0, 1, 0], np.deg2rad(90))
+        #Move Can to Specified Location
+        mountCan.translate([(hmaxz - hminz) / 2  + statorVars['Mount Can Loc'], 0, 0])
+        
+        return mountCan, bounds
+        
+    mountCan, (hminx, hmaxx, hminy, hmaxy, hminz, hmaxz) = cache.get('Mount Can', depends(statorVars, STATOR_DEPS['Mount Can']), buildMountCan)
+    
+    progress(20, 'Duct')
+    
+    def buildDuct():
+        #Draw and Transform the Duct
+        duct = drawDuct(innerDia = statorVars['Duct ID'],
+                                        thickness = statorVars['Duct Thickness'],
+                                        height = statorVars['Duct Length'])
+                                    
+        duct.rotate([0, 1, 0], np.deg2rad(90))
+        #Move to Center
+        duct.translate([((hmaxz - hminz) / 2), 0, 0])
+    
+        return duct
+    
+    duct = cache.get('Duct', depends(statorVars, STATOR_DEPS['Duct']), buildDuct)
+    
+    progress(30, 'Blades')
+    
+    def buildBlades():
+        #Stator Blade Angles and Camber
+        stageProps, rootCamber, tipCamber, avgBetaRoot, avgBetaTip = StageBlade(commonVars, statorVars, 'Stator')
+                            
+        rootAngle = np.rad2deg(avgBetaRoot)
+    
+        #Two different blade heights
+        #Relative is for posistioning, to make sure some of the blade is within the rotor hub
+        #It's the blade height that's exposed
+        relativeBladeHeight = (statorVars['Duct ID'] / 2 - statorVars['Mount Can Dia'] / 2)
+        #Actual height is the actual length of the blade that is created, not all is exposed
+        actualBladeHeight = (statorVars['Duct ID'] / 1.7 - statorVars['Mount Can Dia'] / 2) / np.cos(np.deg2rad(rootAngle))
+    
+        #Generate Blade Template
+        blade = drawBlade(camberRoot = rootCamber,
+                                camberTip = tipCamber,
+                                camberPos = .35, #Can Be Changed
+                                thickness = statorVars['Blade Thickness (Stator)'] / 100,
+                                bladeHeight = actualBladeHeight,
+                                twistAngle = np.rad2deg(avgBetaRoot - avgBetaTip),
+                                rootChord = statorVars['Root Chord (Stator)'],
+                                tipChord = statorVars['Tip Chord (Stator)'],
+                                cot = [statorVars['X Twist (Stator)'], statorVars['Y Twist (Stator)']],
+                                nspan = nspan,
+                                npts = npts)
+    
+        #Rotate and Move the Template Blade
+        blade.rotate([0, 0, 1], np.deg2rad(-rootAngle))
+        blade.translate([0, (((hmaxx - hminx)) / 2) - (relativeBladeHeight / 2), (((hmaxy - hminy)) / 2) - (relativeBladeHeight / 2)])
+        
+        #Move to Specified Location
+        blade.translate([statorVars['Mount Can Loc'], 0, 0])
+        
+        progress(50, 'Pattern')
+        
+        #Pattern the Template Around the Mount Can
+        numBlades = int(statorVars['Num of Blade (Stator)'])
+        return patternBlade(blade, np.deg2rad(rootAngle + ((360 / 10) * np.arange(numBlades))))
+        
+    blades = cache.get('Blades', depends(commonVars, COMMON_KEYS) + depends(statorVars, STATOR_DEPS['Blades']) + (nspan, npts), buildBlades)
+    
+    progress(70, 'Assembly')
+    
+    #Join Mount Can, Blades and Duct
+    assembly = AssemblyBuilder().add(mountCan).add(blades).add(duct)
+    
+    progress(100, 'Done')
+    
+    return assembly
+    
\ No newline at end of file
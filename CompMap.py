@@ -0,0 +1,256 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from BladeCalc import CalcStageBladeAnglesArray
+from CompPerf import *
+from CompSweep import parseGrid
+
+
+#Incidence Past These Stalls or Chokes a Blade Row, Radians
+STALL_INCIDENCE = np.deg2rad(8)
+CHOKE_INCIDENCE = np.deg2rad(-10)
+
+#Loss Bucket, the Loss Coefficient Doubles This Far Off Design Incidence
+LOSS_WIDTH = np.deg2rad(5)
+
+#Extra Exit Deviation per Unit Incidence, the Design Deviation Is Built Into the Metal Angles
+DEVIATION_SLOPE = 0.2
+
+
+################################
+##Function: MapDesign
+#Design point of every stage, the blade metal angles
+#follow the design velocity triangles (zero incidence)
+#and the minimum loss coefficient is set so the stage
+#hits eta at its design point
+##Inputs:
+#stages: (common, rotor, stator) of each stage, in stage
+#number order as StageOpen returns them (list)
+#eta: design stage isentropic efficiency (float)
+##Returns:
+#design: one dict of floats per stage (list)
+################################
+def MapDesign(stages, eta = 0.85):
+    design = []
+    for common, rotor, stator in stages:
+        r, phi, psi, rpm = [float(common[k]) for k in ('Reaction (R)', 'Flow (Phi)', 'Loading (Psi)', 'RPM')]
+        hubDia, tipDia = float(rotor['Hub Diameter']), float(rotor['Rotor Diameter'])
+        
+        meanRadius = (hubDia + tipDia) / 4
+        props = CalcStageBladeAnglesArray(r, phi, psi, rpm, meanRadius)
+        u = float(BladeSpeed(rpm, meanRadius))
+        
+        #Losses at Design, Rotor on the Relative and Stator on the Absolute Inlet Dynamic Head
+        work = psi * u ** 2
+        head = (np.square(props.cx / np.cos(props.beta1)) + np.square(props.cx / np.cos(props.alpha2))) / 2
+        
+        design.append({'u' : u, 'area' : np.pi / 4 * (tipDia ** 2 - hubDia ** 2) / 1e6,
+                        'beta1' : float(props.beta1), 'beta2' : float(props.beta2),
+                        'alpha1' : float(props.alpha1), 'alpha2' : float(props.alpha2),
+                        'omega' : float((1 - eta) * work / head)})
+                        
+    return design
+    
+    
+################################
+##Function: AxialVelocity
+#Axial velocity that passes a mass flow through an
+#annulus, solved on the subsonic branch of the mass
+#flux function
+##Inputs:
+#mdot: mass flow, kg/s (array)
+#area: annulus area, m^2 (float)
+#T0, P0: total temperature, K and pressure, Pa (arrays)
+#alpha: absolute flow angle (array)
+##Returns:
+#(cx, choked): axial velocity, m/s and where the flow
+#can't get through even at Mach 1 (arrays)
+################################
+def AxialVelocity(mdot, area, T0, P0, alpha):
+    mdot, T0, P0, alpha = np.broadcast_arrays(*[np.asarray(x, dtype = np.float64) for x in (mdot, T0, P0, alpha)])
+    
+    def flux(M):
+        return np.sqrt(GAMMA / R_AIR) * P0 / np.sqrt(T0) * M * np.power(1 + (GAMMA - 1) / 2 * np.square(M), -(GAMMA + 1) / (2 * (GAMMA - 1))) * np.cos(alpha)
+        
+    target = mdot / area
+    choked = target >= flux(np.ones_like(target))
+    
+    #Flux Rises Monotonically Up to Mach 1
+    low, high = np.zeros_like(target), np.ones_like(target)
+    for i in range(60):
+        mid = (low + high) / 2
+        under = flux(mid) < target
+        low = np.where(under, mid, low)
+        high = np.where(under, high, mid)
+        
+    M = (low + high) / 2
+    T = T0 / (1 + (GAMMA - 1) / 2 * np.square(M))
+    
+    return M * np.sqrt(GAMMA * R_AIR * T) * np.cos(alpha), choked
+    
+    
+################################
+##Function: EvaluateMap
+#Off design pressure ratio and efficiency, each stage's
+#triangles are rebuilt from the blade speed and the
+#continuity axial velocity, incidence sets the loss and
+#the exit deviation
+##Inputs:
+#design: from MapDesign (list)
+#speed: fraction of design RPM (array)
+#mdot: mass flow, kg/s (array)
+#T01: inlet total temperature, K (float)
+#P01: inlet total pressure, Pa (float)
+##Returns:
+#result: 'PR', 'eta', 'stall', 'choke', 'valid' arrays the
+#shape of speed and mdot broadcast together (dict)
+################################
+def EvaluateMap(design, speed, mdot, T01 = T_STD, P01 = P_STD):
+    speed, mdot = np.broadcast_arrays(np.asarray(speed, dtype = np.float64), np.asarray(mdot, dtype = np.float64))
+    
+    T0, P0 = np.full(speed.shape, float(T01)), np.full(speed.shape, float(P01))
+    alpha1 = np.full(speed.shape, design[0]['alpha1'])
+    stall = np.zeros(speed.shape, dtype = bool)
+    choke = np.zeros(speed.shape, dtype = bool)
+    working = np.ones(speed.shape, dtype = bool)
+    
+    with np.errstate(divide = 'ignore', invalid = 'ignore', over = 'ignore'):
+        for stage in design:
+            u = stage['u'] * speed
+            cx, choked = AxialVelocity(mdot, stage['area'], T0, P0, alpha1)
+            
+            #Rotor, Incidence Against the Inlet Metal Angle
+            beta1 = np.arctan((u - cx * np.tan(alpha1)) / cx)
+            rotorIncidence = beta1 - stage['beta1']
+            beta2 = stage['beta2'] + DEVIATION_SLOPE * rotorIncidence
+            
+            #Stator, Fed by the Rotor Exit, Its Exit Feeds the Next Stage
+            alpha2 = np.arctan((u - cx * np.tan(beta2)) / cx)
+            statorIncidence = alpha2 - stage['alpha2']
+            
+            work = u * (u - cx * np.tan(beta2) - cx * np.tan(alpha1))
+            loss = (stage['omega'] * (1 + np.square(rotorIncidence / LOSS_WIDTH)) * np.square(cx / np.cos(beta1)) / 2
+                    + stage['omega'] * (1 + np.square(statorIncidence / LOSS_WIDTH)) * np.square(cx / np.cos(alpha2)) / 2)
+            eta = 1 - loss / work
+            
+            stall |= (rotorIncidence > STALL_INCIDENCE) | (statorIncidence > STALL_INCIDENCE)
+            choke |= choked | (rotorIncidence < CHOKE_INCIDENCE) | (statorIncidence < CHOKE_INCIDENCE)
+            working &= (work > 0) & (eta > 0) & (eta <= 1)
+            
+            dT0 = work / CP
+            P0 = P0 * StagePressureRatio(dT0, T0, eta)
+            T0 = T0 + dT0
+            alpha1 = stage['alpha1'] + DEVIATION_SLOPE * statorIncidence
+            
+        PR = P0 / P01
+        eta = (np.power(PR, (GAMMA - 1) / GAMMA) - 1) / (T0 / T01 - 1)
+        
+    valid = working & ~stall & ~choke & np.isfinite(PR) & np.isfinite(eta)
+    
+    return {'PR' : PR, 'eta' : eta, 'stall' : stall, 'choke' : choke, 'valid' : valid}
+    
+    
+################################
+##Function: PlotMap
+#Draws the speed lines and surge line to a PNG with
+#the Agg backend
+##Inputs:
+#path: output .png path (str)
+#speeds: fractions of design RPM (array)
+#flow: corrected mass flow, (speeds, points) (array)
+#result: EvaluateMap results, (speeds, points) (dict)
+##Returns:
+#None
+################################
+def PlotMap(path, speeds, flow, result):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    figure = Figure(figsize = (7, 8), dpi = 100)
+    FigureCanvasAgg(figure)
+    axPR = figure.add_subplot(211)
+    axEta = figure.add_subplot(212, sharex = axPR)
+    
+    surge = []
+    for i, speed in enumerate(speeds):
+        valid = result['valid'][i]
+        if not valid.any():
+            continue
+            
+        axPR.plot(flow[i][valid], result['PR'][i][valid], 'b')
+        axPR.annotate('{:.0%}'.format(speed), (flow[i][valid][-1], result['PR'][i][valid][-1]), fontsize = 8)
+        axEta.plot(flow[i][valid], result['eta'][i][valid], 'b')
+        surge.append((flow[i][valid][0], result['PR'][i][valid][0]))
+        
+    if surge:
+        axPR.plot(*zip(*surge), 'r--', label = 'Surge')
+        axPR.legend()
+        
+    axPR.set_title('Compressor Map')
+    axPR.set_ylabel('Total Pressure Ratio')
+    axEta.set_ylabel('Isentropic Efficiency')
+    axEta.set_xlabel('Corrected Mass Flow (kg/s)')
+    figure.tight_layout()
+    figure.savefig(path)
+    
+    
+################################
+##Function: main
+#Command line entry point, builds the map of a
+#compressor file with one speed line per worker
+##Inputs:
+#argv: command line arguments (list)
+##Returns:
+#status: exit code (int)
+################################
+def main(argv = None):
+    from FileOps import StageOpen
+    
+    parser = argparse.ArgumentParser(description = 'Off design compressor map (speed lines) of a CompPy compressor file.')
+    parser.add_argument('file', help = 'compressor .json saved by CompPy')
+    parser.add_argument('--speeds', type = parseGrid, default = parseGrid('0.5,0.6,0.7,0.8,0.9,1.0,1.05'), help = 'fractions of design RPM (default: 0.5,0.6,0.7,0.8,0.9,1.0,1.05)')
+    parser.add_argument('--flows', type = parseGrid, default = parseGrid('0.6:1.4:81'), help = 'mass flows along each line as a fraction of design flow times speed (default: 0.6:1.4:81)')
+    parser.add_argument('--t01', type = float, default = T_STD, help = 'inlet total temperature, K (default: 288.15)')
+    parser.add_argument('--p01', type = float, default = P_STD, help = 'inlet total pressure, Pa (default: 101325)')
+    parser.add_argument('--eta', type = float, default = 0.85, help = 'design stage isentropic efficiency (default: 0.85)')
+    parser.add_argument('-j', '--jobs', type = int, default = None, help = 'worker processes (default: one per CPU)')
+    parser.add_argument('-o', '--out', default = 'map', help = 'output name, writes NAME.npz and NAME.png (default: map)')
+    args = parser.parse_args(argv)
+    
+    start = time.time()
+    try:
+        stages = list(StageOpen(args.file))
+        design = MapDesign(stages, args.eta)
+        designFlow = float(CompressorPerformance(stages[:1], args.t01, args.p01, args.eta)['mdot'][0])
+        
+    #Unreadable File or Incomplete Stages With Empty Fields
+    except (OSError, ValueError, KeyError) as error:
+        print('{}: {}'.format(args.file, error), file = sys.stderr)
+        return 1
+        
+    mdot = np.multiply.outer(args.speeds, args.flows) * designFlow
+    with ProcessPoolExecutor(max_workers = args.jobs) as pool:
+        lines = list(pool.map(EvaluateMap, [design] * len(args.speeds), args.speeds, mdot, [args.t01] * len(args.speeds), [args.p01] * len(args.speeds)))
+        
+    result = {k : np.array([line[k] for line in lines]) for k in lines[0]}
+    flow = mdot * np.sqrt(args.t01 / T_STD) / (args.p01 / P_STD)
+    
+    #Stages Sized for Different Flows Stall Each Other Everywhere
+    if not result['valid'].any():
+        print('{}: no stable operating points, check the stages are sized for the same mass flow'.format(args.file), file = sys.stderr)
+        return 1
+        
+    np.savez(args.out + '.npz', speed = args.speeds, mdot = mdot, mdotCorrected = flow, **result)
+    PlotMap(args.out + '.png', args.speeds, flow, result)
+        
+    print('{0}.npz, {0}.png: {1} speed lines, {2} of {3} points on the map, {4:.2f}s'.format(args.out, len(args.speeds), int(result['valid'].sum()), result['valid'].size, time.time() - start))
+    
+    return 0
+    
+    
+if __name__ == '__main__':
+    sys.exit(main())
+    
\ No newline at end of file
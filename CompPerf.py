@@ -0,0 +1,253 @@
+import argparse
+import sys
+import numpy as np
+
+from BladeCalc import CalcStageBladeAnglesArray
+
+
+#Air, Treated as a Perfect Gas
+CP = 1005.0
+GAMMA = 1.4
+R_AIR = CP * (GAMMA - 1) / GAMMA
+
+#Standard Sea Level Inlet
+T_STD = 288.15
+P_STD = 101325.0
+
+
+################################
+##Function: BladeSpeed
+#Blade speed at a radius
+##Inputs:
+#rpm: ...rpm (array)
+#radius: radius, mm (array)
+##Returns:
+#u: blade speed, m/s (array)
+################################
+def BladeSpeed(rpm, radius):
+    return np.asarray(rpm) / 60 * 2 * np.pi * np.asarray(radius) / 1000
+    
+    
+################################
+##Function: StageTemperatureRise
+#Total temperature rise of a stage from its loading,
+#psi = dh0 / u^2 at the mean line
+##Inputs:
+#psi: loading (array)
+#u: mean line blade speed, m/s (array)
+##Returns:
+#dT0: total temperature rise, K (array)
+################################
+def StageTemperatureRise(psi, u):
+    return np.asarray(psi) * np.square(u) / CP
+    
+    
+################################
+##Function: StagePressureRatio
+#Total pressure ratio of a stage from its temperature
+#rise and isentropic efficiency
+##Inputs:
+#dT0: total temperature rise, K (array)
+#T01: inlet total temperature, K (array)
+#eta: stage isentropic efficiency (array)
+##Returns:
+#PR: total pressure ratio (array)
+################################
+def StagePressureRatio(dT0, T01, eta):
+    return np.power(1 + np.asarray(eta) * np.asarray(dT0) / np.asarray(T01), GAMMA / (GAMMA - 1))
+    
+    
+################################
+##Function: StaticState
+#Static temperature, pressure and density from the
+#total conditions and the absolute velocity
+##Inputs:
+#T0: total temperature, K (array)
+#P0: total pressure, Pa (array)
+#c: absolute velocity, m/s (array)
+##Returns:
+#(T, P, rho): static temperature, pressure and density (arrays)
+################################
+def StaticState(T0, P0, c):
+    T = np.asarray(T0) - np.square(c) / (2 * CP)
+    P = np.asarray(P0) * np.power(T / T0, GAMMA / (GAMMA - 1))
+    
+    return T, P, P / (R_AIR * T)
+    
+    
+################################
+##Function: StageWork
+#Equal temperature rise per stage that gives an
+#overall total pressure ratio, each stage compresses
+#at eta from the exit of the one before
+##Inputs:
+#PR: overall total pressure ratio (array)
+#stages: number of stages (int)
+#T01: inlet total temperature, K (array)
+#eta: stage isentropic efficiency (array)
+#tol: tolerance on the overall pressure ratio (float)
+##Returns:
+#dT0: total temperature rise of every stage, K (array)
+################################
+def StageWork(PR, stages, T01, eta, tol = 1e-10):
+    PR, T01, eta = np.broadcast_arrays(*[np.asarray(x, dtype = np.float64) for x in (PR, T01, eta)])
+    
+    def overall(dT0):
+        ratio = np.ones_like(dT0)
+        for k in range(stages):
+            ratio = ratio * StagePressureRatio(dT0, T01 + k * dT0, eta)
+            
+        return ratio
+        
+    #Pressure Ratio Grows With dT0, Bisect Between No Work and Enough Work for One Stage to Do It All
+    low = np.zeros_like(PR)
+    high = T01 * (np.power(PR, (GAMMA - 1) / GAMMA) - 1) / eta
+    for i in range(200):
+        mid = (low + high) / 2
+        over = overall(mid) > PR
+        high = np.where(over, mid, high)
+        low = np.where(over, low, mid)
+        if np.all(high - low <= tol * np.maximum(high, 1)):
+            break
+            
+    return (low + high) / 2
+    
+    
+################################
+##Function: StagePerformance
+#Temperature and pressure rise through one stage
+##Inputs:
+#psi: loading (array)
+#u: mean line blade speed, m/s (array)
+#T01: inlet total temperature, K (array)
+#P01: inlet total pressure, Pa (array)
+#eta: stage isentropic efficiency (array)
+##Returns:
+#performance: 'dT0', 'PR', 'T02', 'P02' (dict of arrays)
+################################
+def StagePerformance(psi, u, T01, P01, eta):
+    dT0 = StageTemperatureRise(psi, u)
+    PR = StagePressureRatio(dT0, T01, eta)
+    
+    return {'dT0' : dT0, 'PR' : PR, 'T02' : T01 + dT0, 'P02' : P01 * PR}
+    
+    
+#Per Stage Results of CompressorPerformance, in Report Order
+PERF_KEYS = ('dT0', 'PR', 'T0in', 'T0out', 'P0in', 'P0out', 'PRtotal', 'TRtotal', 'etaTotal', 'mdot')
+
+
+################################
+##Function: CompressorPerformance
+#Marches the inlet conditions through every stage of a
+#compressor, the stage fields may be strings (as the GUI
+#holds them), floats or arrays to run a whole sweep at once
+##Inputs:
+#stages: (common, rotor, stator) of each stage (list)
+#T01: inlet total temperature, K (array)
+#P01: inlet total pressure, Pa (array)
+#eta: stage isentropic efficiency (array)
+##Returns:
+#performance: PERF_KEYS -> arrays with one row per stage,
+#PRtotal, TRtotal and etaTotal are cumulative to the end of
+#each stage, mdot is the mass flow each stage's annulus
+#passes at its inlet (dict)
+################################
+def CompressorPerformance(stages, T01 = T_STD, P01 = P_STD, eta = 0.85):
+    value = lambda vars, key: np.asarray(vars[key], dtype = np.float64)
+    
+    rows = []
+    T0, P0 = np.asarray(T01, dtype = np.float64), np.asarray(P01, dtype = np.float64)
+    for common, rotor, stator in stages:
+        r, phi, psi, rpm = [value(common, k) for k in ('Reaction (R)', 'Flow (Phi)', 'Loading (Psi)', 'RPM')]
+        hubDia, tipDia = value(rotor, 'Hub Diameter'), value(rotor, 'Rotor Diameter')
+        
+        #Mean Line Is Midway Up the Blade, the Same One StageCalc Uses
+        meanRadius = (hubDia + tipDia) / 4
+        stage = StagePerformance(psi, BladeSpeed(rpm, meanRadius), T0, P0, eta)
+        
+        #Mass Flow Through the Annulus at the Stage Inlet
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            mean = CalcStageBladeAnglesArray(r, phi, psi, rpm, meanRadius)
+            rho = StaticState(T0, P0, mean.cx / np.cos(mean.alpha1))[2]
+            mdot = rho * mean.cx * np.pi / 4 * (np.square(tipDia) - np.square(hubDia)) / 1e6
+            
+        PRtotal = stage['P02'] / P01
+        TRtotal = stage['T02'] / T01
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            etaTotal = (np.power(PRtotal, (GAMMA - 1) / GAMMA) - 1) / (TRtotal - 1)
+            
+        rows.append({'dT0' : stage['dT0'], 'PR' : stage['PR'], 'T0in' : T0, 'T0out' : stage['T02'], 'P0in' : P0, 'P0out' : stage['P02'],
+                        'PRtotal' : PRtotal, 'TRtotal' : TRtotal, 'etaTotal' : etaTotal, 'mdot' : mdot})
+        T0, P0 = stage['T02'], stage['P02']
+        
+    return {k : np.array([np.broadcast_to(row[k], np.broadcast(*row.values()).shape) for row in rows]) for k in PERF_KEYS}
+    
+    
+################################
+##Function: PerformanceTable
+#Formats CompressorPerformance results of a single
+#compressor as text rows
+##Inputs:
+#performance: from CompressorPerformance (dict)
+#numbers: stage number of each row, 1, 2, ... if None (list)
+##Returns:
+#(header, rows): column titles and one row per stage (lists of str)
+################################
+def PerformanceTable(performance, numbers = None):
+    header = ['Stage', 'dT0 (K)', 'Stage PR', 'T0 Out (K)', 'P0 Out (kPa)', 'Total PR', 'Total Eff', 'Mass Flow (kg/s)']
+    if numbers is None:
+        numbers = range(1, len(performance['PR']) + 1)
+        
+    rows = []
+    for i, number in enumerate(numbers):
+        rows.append(['{}'.format(number),
+                        '{:.2f}'.format(performance['dT0'][i]),
+                        '{:.4f}'.format(performance['PR'][i]),
+                        '{:.2f}'.format(performance['T0out'][i]),
+                        '{:.2f}'.format(performance['P0out'][i] / 1000),
+                        '{:.4f}'.format(performance['PRtotal'][i]),
+                        '{:.4f}'.format(performance['etaTotal'][i]),
+                        '{:.4f}'.format(performance['mdot'][i])])
+                        
+    return header, rows
+    
+    
+################################
+##Function: main
+#Command line entry point, prints the stage by stage
+#performance of a compressor file
+##Inputs:
+#argv: command line arguments (list)
+##Returns:
+#status: exit code (int)
+################################
+def main(argv = None):
+    from FileOps import StageOpen
+    
+    parser = argparse.ArgumentParser(description = 'Stage by stage temperature and pressure ratios of a CompPy compressor file.')
+    parser.add_argument('file', help = 'compressor .json saved by CompPy')
+    parser.add_argument('--t01', type = float, default = T_STD, help = 'inlet total temperature, K (default: 288.15)')
+    parser.add_argument('--p01', type = float, default = P_STD, help = 'inlet total pressure, Pa (default: 101325)')
+    parser.add_argument('--eta', type = float, default = 0.85, help = 'stage isentropic efficiency (default: 0.85)')
+    args = parser.parse_args(argv)
+    
+    try:
+        stages = list(StageOpen(args.file, numbered = True))
+        performance = CompressorPerformance([stage[1:] for stage in stages], args.t01, args.p01, args.eta)
+        
+    #Incomplete Stages Have Empty Fields
+    except (OSError, ValueError, KeyError) as error:
+        print('{}: {}'.format(args.file, error), file = sys.stderr)
+        return 1
+        
+    header, rows = PerformanceTable(performance, [stage[0] for stage in stages])
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+    for line in [header] + rows:
+        print('  '.join(cell.rjust(width) for cell, width in zip(line, widths)))
+        
+    return 0
+    
+    
+if __name__ == '__main__':
+    sys.exit(main())
+    
\ No newline at end of file
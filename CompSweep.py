@@ -0,0 +1,149 @@
+import argparse
+import sys
+import time
+import numpy as np
+
+from BladeCalc import StageCalcArray
+from CompGeom import BladeCamber
+from CompPerf import BladeSpeed, StagePerformance, T_STD, P_STD
+
+
+#Swept Inputs, in Grid Order
+SWEEP_KEYS = ('r', 'phi', 'psi', 'rpm')
+
+#Columns Kept for Every Feasible Point, Angles in Radians
+COLUMNS = SWEEP_KEYS + ('cx', 'rootBeta1', 'rootBeta2', 'tipBeta1', 'tipBeta2',
+                        'rootAlpha1', 'rootAlpha2', 'tipAlpha1', 'tipAlpha2',
+                        'rootCamber', 'tipCamber', 'deHaller', 'dT0', 'PR')
+                        
+                        
+################################
+##Function: SweepPoints
+#Velocity triangles and root/tip camber for arrays of
+#stage inputs, infeasible points are dropped
+##Inputs:
+#r, phi, psi, rpm: stage inputs (arrays, broadcast together)
+#hubDia: hub diameter, mm (float)
+#tipDia: tip diameter, mm (float)
+#rootChord, tipChord: blade chords (floats)
+#deHaller: lowest allowed mean line w2 / w1, 0 to keep all (float)
+#T01: inlet total temperature for the stage rise, K (float)
+#eta: stage isentropic efficiency (float)
+##Returns:
+#columns: COLUMNS -> 1d arrays of the feasible points (dict)
+################################
+def SweepPoints(r, phi, psi, rpm, hubDia, tipDia, rootChord, tipChord, deHaller = 0.72, T01 = T_STD, eta = 0.85):
+    r, phi, psi, rpm = [a.reshape(-1) for a in np.broadcast_arrays(r, phi, psi, rpm)]
+    stageProps = StageCalcArray(r, phi, psi, rpm, hubDia / 2, tipDia / 2)
+    root, mean, tip = stageProps.rootProps, stageProps.meanProps, stageProps.tipProps
+    
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        rootCamber, avgBetaRoot = BladeCamber(root, rootChord)
+        tipCamber, avgBetaTip = BladeCamber(tip, tipChord)
+        
+        #Relative Velocity Ratio Across the Rotor, cx Is Constant so w2 / w1 = cos(beta1) / cos(beta2)
+        haller = np.cos(mean.beta1) / np.cos(mean.beta2)
+        
+    performance = StagePerformance(psi, BladeSpeed(rpm, mean.radius), T01, P_STD, eta)
+    
+    columns = {'r' : r, 'phi' : phi, 'psi' : psi, 'rpm' : rpm, 'cx' : mean.cx,
+                'rootBeta1' : root.beta1, 'rootBeta2' : root.beta2, 'tipBeta1' : tip.beta1, 'tipBeta2' : tip.beta2,
+                'rootAlpha1' : root.alpha1, 'rootAlpha2' : root.alpha2, 'tipAlpha1' : tip.alpha1, 'tipAlpha2' : tip.alpha2,
+                'rootCamber' : rootCamber, 'tipCamber' : tipCamber, 'deHaller' : haller,
+                'dT0' : performance['dT0'], 'PR' : performance['PR']}
+    columns = {k : np.broadcast_to(v, r.shape) for k, v in columns.items()}
+    
+    #Unmatched Stations, No Turning (Camber Blows Up) and Over Diffusing Blades Are Dropped
+    keep = stageProps.converged & (haller >= deHaller) & (phi > 0)
+    for column in columns.values():
+        keep &= np.isfinite(column)
+        
+    return {k : columns[k][keep] for k in COLUMNS}
+    
+    
+################################
+##Function: SweepGrid
+#Evaluates every combination of the given r, phi, psi
+#and rpm values a chunk at a time so memory stays flat
+#however big the grid is
+##Inputs:
+#grids: SWEEP_KEYS -> 1d arrays of values (dict)
+#hubDia, tipDia, rootChord, tipChord, deHaller, T01, eta: see SweepPoints
+#chunk: combinations evaluated at once (int)
+##Returns:
+#columns: feasible points of each chunk (generator of dicts)
+################################
+def SweepGrid(grids, hubDia, tipDia, rootChord, tipChord, deHaller = 0.72, T01 = T_STD, eta = 0.85, chunk = 1 << 20):
+    values = [np.asarray(grids[k], dtype = np.float64).reshape(-1) for k in SWEEP_KEYS]
+    shape = tuple(v.shape[0] for v in values)
+    total = int(np.prod(shape))
+    
+    for start in range(0, total, chunk):
+        index = np.unravel_index(np.arange(start, min(start + chunk, total)), shape)
+        yield SweepPoints(*[v[i] for v, i in zip(values, index)], hubDia = hubDia, tipDia = tipDia,
+                            rootChord = rootChord, tipChord = tipChord, deHaller = deHaller, T01 = T01, eta = eta)
+                            
+                            
+################################
+##Function: parseGrid
+#Reads a grid argument, 'start:stop:num' for evenly
+#spaced values or 'a,b,c' for a list
+##Inputs:
+#text: grid argument (str)
+##Returns:
+#values: grid values (array)
+################################
+def parseGrid(text):
+    try:
+        if ':' in text:
+            start, stop, num = text.split(':')
+            return np.linspace(float(start), float(stop), int(num))
+            
+        return np.array([float(value) for value in text.split(',')])
+        
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected 'start:stop:num' or 'a,b,c', got '{}'".format(text))
+        
+        
+################################
+##Function: main
+#Command line entry point, sweeps the stage design
+#space and writes the feasible points to a .npz file
+##Inputs:
+#argv: command line arguments (list)
+##Returns:
+#status: exit code (int)
+################################
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Sweep reaction, flow, loading and RPM grids and keep the feasible stage designs.')
+    parser.add_argument('--r', type = parseGrid, default = parseGrid('0.3:0.7:41'), help = "reaction grid, 'start:stop:num' or 'a,b,c' (default: 0.3:0.7:41)")
+    parser.add_argument('--phi', type = parseGrid, default = parseGrid('0.3:1.0:71'), help = 'flow coefficient grid (default: 0.3:1.0:71)')
+    parser.add_argument('--psi', type = parseGrid, default = parseGrid('0.2:0.8:61'), help = 'loading coefficient grid (default: 0.2:0.8:61)')
+    parser.add_argument('--rpm', type = parseGrid, default = parseGrid('10000:50000:41'), help = 'RPM grid (default: 10000:50000:41)')
+    parser.add_argument('--hub', type = float, default = 30, help = 'hub diameter, mm (default: 30)')
+    parser.add_argument('--tip', type = float, default = 60, help = 'tip diameter, mm (default: 60)')
+    parser.add_argument('--root-chord', type = float, default = 20, help = 'root chord (default: 20)')
+    parser.add_argument('--tip-chord', type = float, default = 10.88, help = 'tip chord (default: 10.88)')
+    parser.add_argument('--de-haller', type = float, default = 0.72, help = 'lowest allowed w2 / w1 at the mean line, 0 keeps all (default: 0.72)')
+    parser.add_argument('--t01', type = float, default = T_STD, help = 'inlet total temperature for the stage pressure ratio, K (default: 288.15)')
+    parser.add_argument('--eta', type = float, default = 0.85, help = 'stage isentropic efficiency (default: 0.85)')
+    parser.add_argument('-o', '--out', default = 'sweep.npz', help = 'output .npz file, one array per column (default: sweep.npz)')
+    args = parser.parse_args(argv)
+    
+    grids = {'r' : args.r, 'phi' : args.phi, 'psi' : args.psi, 'rpm' : args.rpm}
+    total = int(np.prod([grids[k].shape[0] for k in SWEEP_KEYS]))
+    
+    start = time.time()
+    chunks = list(SweepGrid(grids, args.hub, args.tip, args.root_chord, args.tip_chord, args.de_haller, args.t01, args.eta))
+    columns = {k : np.concatenate([chunk[k] for chunk in chunks]) for k in COLUMNS}
+    seconds = time.time() - start
+    
+    np.savez(args.out, **columns)
+    print('{}: {} of {} points feasible, {:.2f}s ({:.0f} points/s)'.format(args.out, columns['r'].shape[0], total, seconds, total / max(seconds, 1e-9)))
+    
+    return 0
+    
+    
+if __name__ == '__main__':
+    sys.exit(main())
+    
\ No newline at end of file
@@ -0,0 +1,228 @@
+import argparse
+import html
+import os
+import sys
+import time
+
+from CompBatch import RunPool
+from FileOps import StageOpen
+
+
+################################
+##Function: RenderStage
+#Draws one stage's rotor and stator side by side into
+#a PNG with the Agg backend, runs inside a worker process
+##Inputs:
+#path: output .png path (str)
+#common: common properties (dict)
+#rotor: rotor properties (dict)
+#stator: stator properties (dict)
+#endWall: add the rotor support wall (bool)
+#meshCache: on disk cache of built parts (MeshCache) or None
+#budget: most triangles drawn per part (int)
+#dpi: image resolution (int)
+#nspan, npts: blade resolution, see CompGeom.BuildRotor (ints)
+##Returns:
+#(path, seconds): written file, render time
+################################
+def RenderStage(path, common, rotor, stator, endWall = False, meshCache = None, budget = 4000, dpi = 80, nspan = 1, npts = 24):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from MeshCache import CachedAssembly
+    from StlUtils import decimateMesh, meshAxes, plotMesh
+    
+    start = time.time()
+    figure = Figure(figsize = (8, 4), dpi = dpi)
+    FigureCanvasAgg(figure)
+    
+    for position, (part, object) in enumerate((('Rotor', rotor), ('Stator', stator)), 1):
+        mesh = CachedAssembly(meshCache, part, common, object, endWall, nspan = nspan, npts = npts).build()
+        
+        axes = meshAxes(figure, 1, 2, position)
+        axes.set_title(part)
+        plotMesh(axes, mesh, decimateMesh(mesh, budget))
+        
+    #A Half Written Image Would Show Up in the Index as Broken
+    try:
+        figure.savefig(path)
+        
+    except BaseException:
+        if os.path.isfile(path):
+            os.remove(path)
+        raise
+    
+    return path, time.time() - start
+    
+    
+################################
+##Function: ThumbNames
+#Picks a file name prefix for each compressor file,
+#the file's own name where that is unique, otherwise
+#its parent directory is added and a number if even
+#that collides (a/design.json and b/design.json)
+##Inputs:
+#files: paths to compressor .json files (list)
+##Returns:
+#names: file -> prefix (dict)
+################################
+def ThumbNames(files):
+    stem = lambda file: os.path.splitext(os.path.basename(file))[0]
+    parent = lambda file: os.path.basename(os.path.dirname(os.path.abspath(file)))
+    
+    counts = {}
+    for file in files:
+        counts[stem(file)] = counts.get(stem(file), 0) + 1
+        
+    names, used = {}, set()
+    for file in files:
+        name = stem(file) if counts[stem(file)] == 1 else '{}_{}'.format(parent(file), stem(file))
+        unique, number = name, 2
+        while unique in used:
+            unique = '{}_{}'.format(name, number)
+            number += 1
+            
+        names[file] = unique
+        used.add(unique)
+        
+    return names
+    
+    
+################################
+##Function: ThumbJobs
+#Lists the stage thumbnails to draw for a set of
+#compressor files
+##Inputs:
+#files: paths to compressor .json files (list)
+#outDir: output directory (str)
+##Returns:
+#(jobs, unread): (file, stage, path, common, rotor, stator)
+#tuples and the files that could not be read (lists)
+################################
+def ThumbJobs(files, outDir):
+    #The Same File Given Twice Is Only Drawn Once
+    files = list(dict.fromkeys(files))
+    
+    jobs, unread = [], []
+    names = ThumbNames(files)
+    for file in files:
+        try:
+            stages = list(StageOpen(file, numbered = True))
+            
+        #Report Unreadable Files and Catalogue the Rest
+        except (OSError, ValueError, KeyError) as error:
+            unread.append(file)
+            print('{}: failed ({})'.format(file, error), file = sys.stderr)
+            continue
+            
+        for stage, common, rotor, stator in stages:
+            path = os.path.join(outDir, '{}_Stage_{}.png'.format(names[file], stage))
+            jobs.append((file, stage, path, common, rotor, stator))
+            
+    return jobs, unread
+    
+    
+################################
+##Function: WriteIndex
+#Writes an index.html showing every thumbnail,
+#grouped by compressor file
+##Inputs:
+#outDir: output directory (str)
+#jobs: from ThumbJobs (list)
+#failed: paths of thumbnails that failed (set)
+##Returns:
+#path: written index file (str)
+################################
+def WriteIndex(outDir, jobs, failed):
+    lines = ['<!DOCTYPE html>', '<html>', '<head><meta charset="utf-8"><title>CompPy Designs</title></head>', '<body>']
+    
+    file = None
+    for stageFile, stage, path, common, rotor, stator in jobs:
+        if stageFile != file:
+            file = stageFile
+            lines.append('<h2>{}</h2>'.format(html.escape(file)))
+            
+        lines.append('<h3>Stage {}</h3>'.format(stage))
+        if path in failed:
+            lines.append('<p>Could not be rendered.</p>')
+        else:
+            lines.append('<img src="{}" alt="Stage {}">'.format(html.escape(os.path.basename(path)), stage))
+            
+    lines += ['</body>', '</html>']
+    
+    path = os.path.join(outDir, 'index.html')
+    with open(path, 'w') as index:
+        index.write('\n'.join(lines) + '\n')
+        
+    return path
+    
+    
+################################
+##Function: main
+#Command line entry point, draws thumbnails of every
+#stage of a set of compressor files across a process
+#pool without starting Qt
+##Inputs:
+#argv: command line arguments (list)
+##Returns:
+#status: exit code (int)
+################################
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Draw PNG thumbnails of every stage of CompPy compressor files without the GUI.')
+    parser.add_argument('files', nargs = '+', help = 'compressor .json files saved by CompPy')
+    parser.add_argument('-o', '--out', default = 'thumbnails', help = 'output directory (default: thumbnails)')
+    parser.add_argument('-j', '--jobs', type = int, default = None, help = 'worker processes (default: one per CPU)')
+    parser.add_argument('--support-wall', action = 'store_true', help = 'add the support wall around every rotor')
+    parser.add_argument('--budget', type = int, default = 4000, help = 'most triangles drawn per part (default: 4000)')
+    parser.add_argument('--dpi', type = int, default = 80, help = 'image resolution (default: 80)')
+    parser.add_argument('--resolution', type = int, nargs = 2, default = [1, 24], metavar = ('NSPAN', 'NPTS'), help = 'blade segments root to tip and points per blade surface (default: 1 24)')
+    parser.add_argument('--cache-dir', default = None, help = 'mesh cache directory (default: $COMPPY_CACHE or ~/.cache/CompPy/meshes)')
+    parser.add_argument('--no-cache', action = 'store_true', help = 'always rebuild, do not read or write the mesh cache')
+    args = parser.parse_args(argv)
+    nspan, npts = args.resolution
+    
+    if nspan < 1 or npts < 2:
+        parser.error('--resolution needs NSPAN >= 1 and NPTS >= 2')
+    
+    if args.budget < 1:
+        parser.error('--budget needs at least 1 triangle')
+    
+    try:
+        if not os.path.isdir(args.out):
+            os.makedirs(args.out)
+        
+    except OSError as error:
+        print('{}: {}'.format(args.out, error.strerror), file = sys.stderr)
+        return 1
+        
+    jobs, unread = ThumbJobs(args.files, args.out)
+    meshCache = None
+    if not args.no_cache:
+        from MeshCache import MeshCache, CACHE_DIR
+        meshCache = MeshCache(args.cache_dir or CACHE_DIR)
+        
+    failed = set()
+    renders = [(path, common, rotor, stator, args.support_wall, meshCache, args.budget, args.dpi, nspan, npts) for file, stage, path, common, rotor, stator in jobs]
+    
+    for render, result, error in RunPool(RenderStage, renders, args.jobs):
+        if error is None:
+            path, seconds = result
+            print('{}: {:.2f}s'.format(path, seconds))
+                    
+        #Incomplete Stages, Unwritable Output or a Lost Worker, Report Them and Carry On
+        else:
+            failed.add(render[0])
+            print('{}: failed ({})'.format(render[0], error), file = sys.stderr)
+                
+    try:
+        print(WriteIndex(args.out, jobs, failed))
+                
+    except OSError as error:
+        print('{}: failed ({})'.format(os.path.join(args.out, 'index.html'), error), file = sys.stderr)
+        return 1
+    
+    return 1 if failed or unread else 0
+    
+    
+if __name__ == '__main__':
+    sys.exit(main())
+    
\ No newline at end of file
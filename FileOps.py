@@ -2,19 +2,43 @@ import json
 from collections import OrderedDict
 
 
+################################
+##Function: stageNumber
+#Stage number from a 'Stage N' key, so stages sort
+#numerically (Stage 2 before Stage 10)
+##Inputs:
+#key: stage key (str)
+##Returns:
+#number: stage number (int)
+################################
+def stageNumber(key):
+    try:
+        return int(key.split()[-1])
+        
+    except (ValueError, IndexError):
+        raise ValueError("Stage key '{}' is not of the form 'Stage N'".format(key))
+        
+        
 ################################
 ##Function: StageOpen
-#Opens Saved Compressor Json File
+#Opens Saved Compressor Json File, stages come back
+#in stage number order whatever the key order in the file
 ##Inputs: 
 #file: path to file (str)
+#numbered: also yield each stage's number (bool)
 ##Returns:
 #data: full compressor params (dict)
 ################################
-def StageOpen(file):
+def StageOpen(file, numbered = False):
     with open(file) as dataFile:
-        data = json.load(dataFile, object_pairs_hook = OrderedDict)
+        #Skip // Comment Lines Like the Ones in the Example File
+        text = ''.join(line for line in dataFile if not line.lstrip().startswith('//'))
+        data = json.loads(text, object_pairs_hook = OrderedDict)
         
-        for stage in data:
+    for stage in sorted(data, key = stageNumber):
+        if numbered:
+            yield stageNumber(stage), data[stage]['Stage'], data[stage]['Rotor'], data[stage]['Stator']
+        else:
             yield data[stage]['Stage'], data[stage]['Rotor'], data[stage]['Stator']
             
 
@@ -37,5 +61,5 @@ def StageSave(file, common, rotor, stator):
         for stage in range(1, len(common) + 1):
             stages['Stage ' + str(stage)] = {'Stage': common[stage - 1], 'Rotor': rotor[stage - 1], 'Stator': stator[stage - 1]}
             
-        #Dump dictionary
-        json.dump(stages, dataFile, indent = 4, sort_keys = True, ensure_ascii=True)
\ No newline at end of file
+        #Dump dictionary, Stages Stay in Order (Sorted Keys Would Put Stage 10 Before Stage 2)
+        json.dump(stages, dataFile, indent = 4, ensure_ascii=True)
\ No newline at end of file
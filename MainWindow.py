@@ -1,3 +1,8 @@
+import sys
+import StartupProfile
+if '--profile-startup' in sys.argv:
+    StartupProfile.start()
+
 try:
     from PyQt4.QtCore import *
     from PyQt4.QtGui import *
@@ -9,10 +14,12 @@ except ImportError:
     from PyQt5.QtGui import *
     version = 5
 
-import BladePlot
-import RenderWindow
+#BladePlot and RenderWindow Pull In matplotlib, numpy and numpy-stl,
+#They Are Imported the First Time a Profile or Render Is Asked For
 from FileOps import *
 
+StartupProfile.mark('imports')
+
 
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
@@ -28,6 +35,10 @@ class Ui_MainWindow(object):
         self.statorValidators = {"Duct ID" : None, "Duct Length" : None, "Duct Thickness" : None, "Num of Blade (Stator)" : None, "Mount Can Length" : None, "Mount Can Dia" : None, "Mount Can Loc" : None, "Blade Thickness (Stator)" : None, "Root Chord (Stator)" : None, "Tip Chord (Stator)" : None, "X Twist (Stator)" : None, "Y Twist (Stator)" : None}
         
         self.exportObj = None
+        self.renderJob = None
+        self.staleJobs = []
+        self.componentCache = {}
+        self.meshCache = None
         self.clicked = None
         self.fileOpen = False
         self.failed = []
@@ -370,6 +381,12 @@ class Ui_MainWindow(object):
         
         self.gridLayout_4.addWidget(self.renderExport, 3, 1, 1, 1)
         
+        self.performanceButton = QPushButton(self.L_Frame)
+        self.performanceButton.setObjectName("performanceButton")
+        self.performanceButton.clicked.connect(self.Performance)
+        
+        self.gridLayout_4.addWidget(self.performanceButton, 4, 1, 1, 1)
+        
         self.frame = QFrame(self.L_Frame)
         self.frame.setFrameShape(QFrame.StyledPanel)
         self.frame.setFrameShadow(QFrame.Raised)
@@ -720,6 +737,7 @@ class Ui_MainWindow(object):
         self.addButton.setText("Add Stage")
         self.profileButton.setText("Draw Blade Profile")
         self.renderButton.setText("Render STL")
+        self.performanceButton.setText("Stage Performance")
         self.DI_Label.setText("Duct ID")
         self.S_Title.setText("Stator Specifications")
         self.DT_Label.setText("Duct Thickness")
@@ -897,6 +915,50 @@ class Ui_MainWindow(object):
             box.exec_()
                                 
     
+    ################################
+    ##Function: Performance
+    #Shows the temperature and pressure rise of every
+    #stage at sea level inlet conditions
+    ##Inputs: 
+    #self: Ui_MainWindow
+    ##Returns:
+    #none
+    ################################   
+    def Performance(self):
+        from RClickWin import PerformanceWindow
+        from CompPerf import CompressorPerformance, PerformanceTable, T_STD, P_STD
+        
+        if not self.commonVars:
+            return
+            
+        #Make sure the current stage is saved to the dictionaries
+        if self.clicked is not None:
+            for dict in [self.commonVars[self.clicked], self.rotorVars[self.clicked], self.statorVars[self.clicked]]:
+                for item in dict:
+                    text = MainWindow.findChild(QLineEdit, item).text()
+                    if text:
+                        dict[item] = text
+                        
+        eta = 0.85
+        try:
+            performance = CompressorPerformance(list(zip(self.commonVars, self.rotorVars, self.statorVars)), T_STD, P_STD, eta)
+            
+        #Stages With Empty Fields Can't Be Evaluated
+        except ValueError:
+            box = QMessageBox(MainWindow)
+            box.setText("Incomplete Stages")
+            box.setInformativeText("Fill in every stage's fields first")
+            box.setWindowTitle("Performance Error")
+            box.exec_()
+            return
+            
+        #Label Rows the Way the Stage List Does
+        numbers = [self.listWidget.item(i).text().split()[-1] for i in range(self.listWidget.count())]
+        header, rows = PerformanceTable(performance, numbers)
+        note = "Inlet {:.2f} K, {:.3f} kPa, stage isentropic efficiency {:.2f}".format(T_STD, P_STD / 1000, eta)
+        PerformanceWindow(MainWindow, header, rows, note).exec_()
+                                
+    
     ################################
     ##Function: CheckState
     #Determines validity of currently editing qLineEdit
@@ -908,6 +970,9 @@ class Ui_MainWindow(object):
     #none
     ################################       
     def CheckState(self):
+        #Any Edit Makes a Build in Progress Obsolete
+        self.CancelRender()
+        
         sender = MainWindow.sender()
         state = sender.validator().validate(sender.text(), 0)[0]
         
@@ -965,7 +1030,7 @@ class Ui_MainWindow(object):
         from RClickWin import RenderSel, ErrorWindow
         
         #Delete Currently Occupating Widget
-        for i in reversed(range(self.R_FrameLayout.count())): self.R_FrameLayout.itemAt(i).widget().setParent(None)
+        self.ClearPanel()
         
         #Make sure the current stage is saved to the dictionaries
         for dict in [self.commonVars[self.clicked], self.rotorVars[self.clicked], self.statorVars[self.clicked]]:
@@ -983,11 +1048,7 @@ class Ui_MainWindow(object):
                 
                 #If there was no failure
                 if not self.failed: 
-                    prof = BladePlot.NACA4Profile(MainWindow, self.commonVars[self.clicked], self.rotorVars[self.clicked], "R")
-                    self.R_FrameLayout.addWidget(prof)
-                    prof.plotter()
-                    self.R_Frame.setLayout(self.R_FrameLayout)
-                    prof.close()
+                    self.ShowProfile(self.rotorVars[self.clicked], "R")
                     
                 #If there was a failure, show the failures
                 else: ErrorWindow(MainWindow, self.failed).show()
@@ -998,11 +1059,7 @@ class Ui_MainWindow(object):
                 
                 #If there was no failure
                 if not self.failed: 
-                    prof = BladePlot.NACA4Profile(MainWindow, self.commongVars[self.clicked], self.statorVars[self.clicked], "S")
-                    self.R_FrameLayout.addWidget(prof)
-                    prof.plotter()
-                    self.R_Frame.setLayout(self.R_FrameLayout)
-                    prof.close()
+                    self.ShowProfile(self.statorVars[self.clicked], "S")
                 
                 #If there was a failure, show the failures
                 else: ErrorWindow(MainWindow, self.failed).show()
@@ -1012,6 +1069,37 @@ class Ui_MainWindow(object):
         #Reset failed list
         self.failed = []
         
+        
+    ################################
+    ##Function: ShowProfile
+    #Plots a blade's root and tip profiles in the
+    #right panel
+    ##Inputs:
+    #self: Ui_MainWindow
+    #object: rotor or stator properties (dict)
+    #stage: rotor ('R') or stator ('S')
+    ##Returns:
+    #none
+    ################################
+    def ShowProfile(self, object, stage):
+        import BladePlot
+        
+        try:
+            prof = BladePlot.NACA4Profile(MainWindow, self.commonVars[self.clicked], object, stage)
+            
+        #Root or Tip Can't Be Matched to the Mean Line
+        except ValueError as error:
+            box = QMessageBox(MainWindow)
+            box.setText("Blade Can't Be Calculated")
+            box.setInformativeText(str(error))
+            box.setWindowTitle("Profile Error")
+            box.exec_()
+            return
+            
+        self.R_FrameLayout.addWidget(prof)
+        prof.plotter()
+        self.R_Frame.setLayout(self.R_FrameLayout)
+        
 
     ################################
     ##Function: Render
@@ -1023,9 +1111,12 @@ class Ui_MainWindow(object):
     ################################   
     def Render(self):
         from RClickWin import RenderSel, ErrorWindow
+        from CompGeom import ComponentCache
+        from MeshCache import MeshCache
+        import RenderWindow
         
-        #Delete Currently Occupating Widget
-        for i in reversed(range(self.R_FrameLayout.count())): self.R_FrameLayout.itemAt(i).widget().setParent(None)
+        #Replace Any Build Still Running and Delete Currently Occupating Widget
+        self.ClearPanel()
         
         #Make sure the current stage is saved to the dictionaries
         for dict in [self.commonVars[self.clicked], self.rotorVars[self.clicked], self.statorVars[self.clicked]]:
@@ -1038,6 +1129,10 @@ class Ui_MainWindow(object):
         wind = RenderSel(MainWindow)
         wind.show()
         
+        #Stages Rendered Before, This Session or Any Other, Load From Disk
+        if self.meshCache is None:
+            self.meshCache = MeshCache()
+            
         #Make sure self.clicked has a value
         if self.clicked: pass
         else: self.clicked = 0
@@ -1050,10 +1145,10 @@ class Ui_MainWindow(object):
                 
                 #If there was no failure
                 if not self.failed: 
-                    rend = RenderWindow.RenderWindow(MainWindow, self.commonVars[self.clicked], self.rotorVars[self.clicked], "R", self.wallCheck.isChecked())
-                    self.R_FrameLayout.addWidget(rend)
-                    self.R_Frame.setLayout(self.R_FrameLayout)
-                    self.exportObj = rend.returnObject()
+                    #Parts Whose Fields Were Not Edited Come From the Last Render
+                    cache = self.componentCache.setdefault((self.clicked, "R"), ComponentCache())
+                    rend = RenderWindow.RenderWindow(MainWindow, self.commonVars[self.clicked], self.rotorVars[self.clicked], "R", self.wallCheck.isChecked(), cache, self.meshCache)
+                    self.StartRender(rend)
                     
                 #If there was a failure, show the failures
                 else: ErrorWindow(MainWindow, self.failed).show()
@@ -1064,10 +1159,9 @@ class Ui_MainWindow(object):
                 
                 #If there was no failure
                 if not self.failed: 
-                    rend = RenderWindow.RenderWindow(MainWindow, self.commonVars[self.clicked], self.statorVars[self.clicked], "S")
-                    self.R_FrameLayout.addWidget(rend)
-                    self.R_Frame.setLayout(self.R_FrameLayout)
-                    self.exportObj = rend.returnObject()
+                    cache = self.componentCache.setdefault((self.clicked, "S"), ComponentCache())
+                    rend = RenderWindow.RenderWindow(MainWindow, self.commonVars[self.clicked], self.statorVars[self.clicked], "S", cache = cache, meshCache = self.meshCache)
+                    self.StartRender(rend)
                 
                 #If there was a failure, show the failures
                 else: ErrorWindow(MainWindow, self.failed).show()
@@ -1076,6 +1170,119 @@ class Ui_MainWindow(object):
   
         #Reset failed list
         self.failed = []
+        
+        
+    ################################
+    ##Function: ClearPanel
+    #Takes down the plot or render in the right panel,
+    #its canvas goes back to the pool and the widget is
+    #deleted, builds still running are deleted once their
+    #thread exits
+    ##Inputs:
+    #self: Ui_MainWindow
+    ##Returns:
+    #none
+    ################################
+    def ClearPanel(self):
+        self.CancelRender()
+        
+        for i in reversed(range(self.R_FrameLayout.count())):
+            widget = self.R_FrameLayout.itemAt(i).widget()
+            if hasattr(widget, 'release'):
+                widget.release()
+                
+            widget.setParent(None)
+            if widget not in self.staleJobs:
+                widget.deleteLater()
+                
+                
+    ################################
+    ##Function: StartRender
+    #Shows a RenderWindow whose geometry is being
+    #built in the background and tracks it as the
+    #current render job
+    ##Inputs:
+    #self: Ui_MainWindow
+    #rend: RenderWindow
+    ##Returns:
+    #none
+    ################################
+    def StartRender(self, rend):
+        self.exportObj = None
+        self.renderJob = rend
+        rend.ready.connect(lambda obj: self.RenderReady(rend, obj))
+        
+        #Connected Up Front so a Build That Ends Before It Is Cancelled Is Still Seen,
+        #Queued so It Runs on the GUI Thread After CancelRender Has Returned
+        rend.worker.finished.connect(lambda: self.RenderFinished(rend), type = Qt.QueuedConnection)
+        
+        self.R_FrameLayout.addWidget(rend)
+        self.R_Frame.setLayout(self.R_FrameLayout)
+        
+        
+    ################################
+    ##Function: RenderReady
+    #Keeps the finished object for export, unless
+    #a newer render has replaced the job
+    ##Inputs:
+    #self: Ui_MainWindow
+    #rend: RenderWindow that finished
+    #obj: object mesh
+    ##Returns:
+    #none
+    ################################
+    def RenderReady(self, rend, obj):
+        if rend is self.renderJob:
+            self.exportObj = obj
+            
+            
+    ################################
+    ##Function: CancelRender
+    #Aborts the current background build, the
+    #window is kept alive until its thread exits
+    ##Inputs:
+    #self: Ui_MainWindow
+    ##Returns:
+    #none
+    ################################
+    def CancelRender(self):
+        job = self.renderJob
+        self.renderJob = None
+        
+        if job is not None and job.isRunning():
+            job.cancel()
+            self.staleJobs.append(job)
+            
+            
+    ################################
+    ##Function: RenderFinished
+    #Deletes a cancelled job once its thread has
+    #exited, jobs still shown are left to ClearPanel
+    ##Inputs:
+    #self: Ui_MainWindow
+    #rend: RenderWindow whose worker finished
+    ##Returns:
+    #none
+    ################################
+    def RenderFinished(self, rend):
+        if rend in self.staleJobs:
+            self.staleJobs.remove(rend)
+            rend.deleteLater()
+            
+            
+    ################################
+    ##Function: StopRenders
+    #Cancels every build and waits for the threads,
+    #called when the application quits
+    ##Inputs:
+    #self: Ui_MainWindow
+    ##Returns:
+    #none
+    ################################
+    def StopRenders(self):
+        self.CancelRender()
+        for job in list(self.staleJobs):
+            job.worker.wait()
                                 
     
     ################################
@@ -1092,11 +1299,20 @@ class Ui_MainWindow(object):
         event.ignore()
         
 if __name__ == "__main__":
-    import sys
+    if '--profile-startup' in sys.argv:
+        sys.argv.remove('--profile-startup')
+        
     app = QApplication(sys.argv)
+    StartupProfile.mark('QApplication')
     MainWindow = QMainWindow()
     ui = Ui_MainWindow()
     ui.setupUi(MainWindow)
+    app.aboutToQuit.connect(ui.StopRenders)
+    StartupProfile.mark('setupUi')
     MainWindow.show()
+    StartupProfile.mark('show')
+    
+    #Report Once the Event Loop Is Up and the Window Has Painted
+    QTimer.singleShot(0, lambda: (StartupProfile.mark('first event'), StartupProfile.report()))
     sys.exit(app.exec_())
 
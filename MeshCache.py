@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+from StlUtils import IndexedMesh, AssemblyBuilder
+from CompGeom import BuildRotor, BuildStator, GEOMETRY_VERSION, noProgress, partName
+
+
+#Cache Location, Shared by the GUI and CompBatch
+CACHE_DIR = os.environ.get('COMPPY_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'CompPy', 'meshes'))
+
+
+################################
+##Function: MeshCache
+#Content addressed on disk cache of built rotors and
+#stators. Entries are keyed by a hash of the stage
+#properties and GEOMETRY_VERSION, stored as .npy vertex
+#and face arrays and memory mapped back in. The least
+#recently used entries are removed once the cache
+#grows past maxBytes. The cache only ever speeds builds
+#up, a directory that can't be read or written just
+#means every part is built
+##Inputs:
+#directory: where entries are kept (str)
+#maxBytes: size limit of the cache (int)
+##Returns:
+#None
+################################
+class MeshCache(object):
+    def __init__(self, directory = CACHE_DIR, maxBytes = 512 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        
+        
+    ################################
+    ##Function: key
+    #Canonical hash of everything a part is built from,
+    #'30' and '30.000' give the same key
+    ##Inputs:
+    #part: 'R', 'Rotor', 'S' or 'Stator' (str)
+    #common: common properties (dict)
+    #object: rotor or stator properties (dict)
+    #endWall: rotor support wall (bool)
+    #nspan, npts: blade resolution (ints)
+    ##Returns:
+    #key: hex digest (str)
+    ################################
+    def key(self, part, common, object, endWall = False, nspan = 1, npts = 24):
+        part = partName(part)
+        content = {'version' : GEOMETRY_VERSION,
+                    'part' : part,
+                    'common' : {k : float(v) for k, v in common.items()},
+                    'object' : {k : float(v) for k, v in object.items()},
+                    'endWall' : bool(endWall) and part == 'Rotor',
+                    'resolution' : [int(nspan), int(npts)]}
+                    
+        return hashlib.sha256(json.dumps(content, sort_keys = True).encode('utf-8')).hexdigest()
+        
+        
+    def paths(self, key):
+        return (os.path.join(self.directory, key + '_vertices.npy'),
+                os.path.join(self.directory, key + '_faces.npy'))
+                
+                
+    ################################
+    ##Function: load
+    #Memory maps a cached mesh copy on write, so it can be
+    #modified (translate) without touching the cache file
+    ##Inputs:
+    #key: from MeshCache.key (str)
+    ##Returns:
+    #mesh: cached mesh (IndexedMesh) or None if not cached
+    ################################
+    def load(self, key):
+        vertexPath, facePath = self.paths(key)
+        
+        #Missing, Half Written or Evicted by Another Process All Count as a Miss
+        try:
+            mesh = IndexedMesh(np.load(vertexPath, mmap_mode = 'c'), np.load(facePath, mmap_mode = 'c'))
+            
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+            
+        #Mark It Recently Used, a Read Only Cache Is Still a Hit
+        try:
+            os.utime(vertexPath)
+            
+        except OSError:
+            pass
+            
+        self.hits += 1
+        return mesh
+        
+        
+    ################################
+    ##Function: store
+    #Writes a mesh into the cache then trims the cache
+    #back under maxBytes, a cache that can't be written
+    #to is skipped
+    ##Inputs:
+    #key: from MeshCache.key (str)
+    #mesh: mesh to keep (IndexedMesh)
+    ##Returns:
+    #stored: if the mesh was written (bool)
+    ################################
+    def store(self, key, mesh):
+        temp = None
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, exist_ok = True)
+            
+            #Write Under a Temporary Name and Rename so Readers Never See Half a File,
+            #Faces Go First as the Vertex File Marks the Entry
+            for path, array in zip(reversed(self.paths(key)), (mesh.faces, mesh.vertices)):
+                temp = '{}.{}.tmp'.format(path, os.getpid())
+                with open(temp, 'wb') as file:
+                    np.save(file, array)
+                
+                os.replace(temp, path)
+                temp = None
+            
+            self.evict()
+            
+        #Don't Leave a Temporary File or Half an Entry Behind
+        except OSError:
+            if temp is not None:
+                try:
+                    os.remove(temp)
+                except OSError:
+                    pass
+                    
+            self.remove(key)
+            return False
+            
+        return True
+        
+        
+    ################################
+    ##Function: entries
+    #Lists the cached entries
+    ##Inputs:
+    #None
+    ##Returns:
+    #entries: (last used, bytes, key) tuples (list)
+    ################################
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+            
+        try:
+            names = os.listdir(self.directory)
+            
+        except OSError:
+            return []
+            
+        entries = []
+        for name in names:
+            if not name.endswith('_vertices.npy'):
+                continue
+                
+            key = name[:-len('_vertices.npy')]
+            try:
+                used = os.path.getmtime(os.path.join(self.directory, name))
+                size = sum(os.path.getsize(path) for path in self.paths(key))
+                
+            except OSError:
+                continue
+                
+            entries.append((used, size, key))
+            
+        return entries
+        
+        
+    ################################
+    ##Function: evict
+    #Removes least recently used entries until the
+    #cache is no bigger than maxBytes
+    ##Inputs:
+    #None
+    ##Returns:
+    #removed: number of entries removed (int)
+    ################################
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for used, size, key in entries)
+        removed = 0
+        
+        for used, size, key in entries:
+            if total <= self.maxBytes:
+                break
+                
+            self.remove(key)
+            total -= size
+            removed += 1
+            
+        return removed
+        
+        
+    def remove(self, key):
+        for path in self.paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+                
+                
+    def clear(self):
+        for used, size, key in self.entries():
+            self.remove(key)
+            
+            
+################################
+##Function: CachedAssembly
+#Builds a rotor or stator, going through the disk
+#cache when one is given
+##Inputs:
+#meshCache: disk cache (MeshCache) or None
+#part: 'R', 'Rotor', 'S' or 'Stator' (str)
+#common: common properties (dict)
+#object: rotor or stator properties (dict)
+#endWall: add the rotor support wall (bool)
+#progress: callback(percent, message), may raise
+#RenderCancelled to stop the build
+#cache: in memory components (ComponentCache)
+#nspan, npts: blade resolution, see BuildRotor (ints)
+##Returns:
+#assembly: part components (AssemblyBuilder)
+################################
+def CachedAssembly(meshCache, part, common, object, endWall = False, progress = noProgress, cache = None, nspan = 1, npts = 24):
+    part = partName(part)
+    
+    def build():
+        if part == 'Rotor':
+            return BuildRotor(common, object, endWall, progress, cache, nspan, npts)
+            
+        return BuildStator(common, object, progress, cache, nspan, npts)
+        
+    if meshCache is None:
+        return build()
+        
+    key = meshCache.key(part, common, object, endWall, nspan, npts)
+    mesh = meshCache.load(key)
+    
+    if mesh is None:
+        mesh = build().build()
+        meshCache.store(key, mesh)
+        
+    else:
+        progress(100, 'Cached')
+        
+    return AssemblyBuilder().add(mesh)
+    
\ No newline at end of file
@@ -74,4 +74,47 @@ class ErrorWindow(QDialog):
         
         
     def close(self):
-        self.accept()
\ No newline at end of file
+        self.accept()
+        
+        
+################################
+##Function: PerformanceWindow
+#Stage by Stage Performance Table
+##Inputs: 
+#parent: parent obj
+#header: column titles (list)
+#rows: one row of cells per stage (list)
+#note: inlet conditions used (str)
+##Returns:
+#None
+################################         
+class PerformanceWindow(QDialog):
+    def __init__(self, parent, header, rows, note):
+        super(PerformanceWindow, self).__init__(parent)
+        self.setWindowTitle('Stage Performance')
+        layout = QVBoxLayout()
+        
+        table = QTableWidget(len(rows), len(header))
+        table.setHorizontalHeaderLabels(header)
+        table.verticalHeader().hide()
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        
+        for i, row in enumerate(rows):
+            for j, cell in enumerate(row):
+                item = QTableWidgetItem(cell)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(i, j, item)
+                
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+        
+        label = QLabel()
+        label.setText(note)
+        layout.addWidget(label)
+        
+        okButton = QPushButton('Gotcha')
+        okButton.clicked.connect(self.accept)
+        layout.addWidget(okButton)
+        
+        self.setLayout(layout)
+        self.resize(820, 300)
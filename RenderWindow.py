@@ -8,43 +8,148 @@ except ImportError:
     from PyQt5.QtWidgets import *
     
 from BladeRender import RenderRotor, RenderStator
+from CompGeom import RenderCancelled
+
+
+################################
+##Function: RenderWorker
+#Runs a render widget's objCalc on a worker thread
+#so the GUI thread never blocks on geometry
+##Inputs:
+#parent: parent (obj)
+#window: RenderRotor or RenderStator built with build = False
+##Returns:
+#built: emitted with the widget once objCalc finishes
+################################
+class RenderWorker(QThread):
+    progress = pyqtSignal(int, str)
+    built = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+    
+    def __init__(self, parent, window):
+        super(RenderWorker, self).__init__(parent)
+        
+        self.window = window
+        self.stop = False
+        
+        
+    def run(self):
+        try:
+            self.window.objCalc(progress = self.report)
+            
+        except RenderCancelled:
+            self.cancelled.emit()
+            
+        except Exception as error:
+            self.failed.emit(str(error))
+            
+        else:
+            self.built.emit(self.window)
+            
+            
+    #Progress Callback, Also the Point Where Cancellation Takes Effect
+    def report(self, percent, message):
+        if self.stop:
+            raise RenderCancelled()
+            
+        self.progress.emit(percent, message)
+        
+        
+    def cancel(self):
+        self.stop = True
 
 
 ################################
 ##Function: RenderWindow
-#QWidget That Hosts Rendered Object Plot
+#QWidget That Hosts Rendered Object Plot,
+#geometry is built on a RenderWorker and drawn
+#once it arrives
 ##Inputs: 
 #parent: parent (obj)
 #common: common properties (dict)
 #object: stage properties (dict)
 #stage: stator ('S') or rotor ('R')
 #checked: if endwall was checked (bool)
+#cache: components kept from earlier renders (ComponentCache)
+#meshCache: on disk cache of whole parts (MeshCache)
 ##Returns:
-#self.window.getObj(): object mesh
+#ready: emitted with self.window.getObj(), the object mesh
 ################################
 class RenderWindow(QWidget):
-    def __init__(self, parent, common, object, stage, checked = False):
+    ready = pyqtSignal(object)
+    
+    def __init__(self, parent, common, object, stage, checked = False, cache = None, meshCache = None):
         super(RenderWindow, self).__init__(parent)
         
         self.commonVars = common
         self.objectVars = object
+        self.released = False
         self.verticalLayout = QVBoxLayout()
         
         if stage == 'R':
-            self.window = RenderRotor(self, self.commonVars, self.objectVars, checked)
+            self.window = RenderRotor(self, self.commonVars, self.objectVars, checked, build = False, cache = cache, meshCache = meshCache)
         else:
-            self.window = RenderStator(self, self.commonVars, self.objectVars)
+            self.window = RenderStator(self, self.commonVars, self.objectVars, build = False, cache = cache, meshCache = meshCache)
             
         self.window.show()
         self.window.setMinimumSize(QSize(0, 200))
         self.window.setObjectName("window")
         
+        self.progressBar = QProgressBar(self)
+        self.progressBar.setRange(0, 100)
+        self.progressBar.setObjectName("progressBar")
+        
+        self.verticalLayout.addWidget(self.progressBar)
         self.verticalLayout.addWidget(self.window)
         
         self.setLayout(self.verticalLayout)
         
+        #Build the Geometry Off the GUI Thread
+        self.worker = RenderWorker(self, self.window)
+        self.worker.progress.connect(self.showProgress)
+        self.worker.built.connect(self.showObject)
+        self.worker.failed.connect(self.showFailure)
+        self.worker.start()
+        
+        
+    def showProgress(self, percent, message):
+        self.progressBar.setValue(percent)
+        self.progressBar.setFormat("{}... %p%".format(message))
+        
+        
+    def showObject(self, window):
+        self.progressBar.hide()
+        
+        #Finished After Being Taken Down, Its Canvas Is No Longer Ours to Draw On
+        if not self.released:
+            window.render()
+            self.ready.emit(window.getObj())
+            
+        
+    def showFailure(self, message):
+        self.progressBar.setFormat("Render Failed: {}".format(message))
+        
+        
+    def isRunning(self):
+        return self.worker.isRunning()
+        
+        
+    #Abandon the Build, the Worker Stops at Its Next Progress Report
+    def cancel(self):
+        self.worker.cancel()
+        
+        
+    #Hand the Canvas Back to the Pool
+    def release(self):
+        self.released = True
+        self.window.release()
+        
         
     def returnObject(self):
+        if self.isRunning():
+            return None
+            
         return self.window.getObj()
         
 ###USED FOR QUICK TESTING
@@ -57,4 +162,3 @@ if __name__ == "__main__":
     ui = RenderWindow(None, common, rotor, 'R', False)
     ui.show()
     sys.exit(app.exec_())
-
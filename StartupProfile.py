@@ -0,0 +1,91 @@
+import builtins
+import sys
+import time
+
+
+#Collected Timings, Only Filled In Once start() Is Called
+imports = []
+marks = []
+state = {'depth' : 0, 'import' : None}
+
+
+################################
+##Function: start
+#Starts timing, every top level import from here
+#on is timed along with everything it pulls in
+##Inputs:
+#None
+##Returns:
+#None
+################################
+def start():
+    if state['import'] is not None:
+        return
+        
+    state['import'] = builtins.__import__
+    builtins.__import__ = timedImport
+    marks.append(('start', time.perf_counter()))
+    
+    
+################################
+##Function: timedImport
+#Stand in for __import__ that records how long each
+#outermost import takes, nested imports count
+#towards the import that triggered them
+##Inputs:
+#same as __import__
+##Returns:
+#module: imported module
+################################
+def timedImport(name, globals = None, locals = None, fromlist = (), level = 0):
+    if state['depth'] or name in sys.modules:
+        return state['import'](name, globals, locals, fromlist, level)
+        
+    state['depth'] += 1
+    begin = time.perf_counter()
+    try:
+        return state['import'](name, globals, locals, fromlist, level)
+        
+    finally:
+        imports.append((name, time.perf_counter() - begin))
+        state['depth'] -= 1
+        
+        
+################################
+##Function: mark
+#Records the end of a startup phase
+##Inputs:
+#label: phase name (str)
+##Returns:
+#None
+################################
+def mark(label):
+    if state['import'] is not None:
+        marks.append((label, time.perf_counter()))
+        
+        
+################################
+##Function: report
+#Stops timing and prints the import and phase breakdown
+##Inputs:
+#stream: where to print (file)
+##Returns:
+#None
+################################
+def report(stream = sys.stderr):
+    if state['import'] is None:
+        return
+        
+    builtins.__import__ = state['import']
+    state['import'] = None
+    
+    print('Startup imports:', file = stream)
+    for name, seconds in sorted(imports, key = lambda item: -item[1]):
+        print('  {:<30} {:8.1f} ms'.format(name, seconds * 1000), file = stream)
+        
+    print('Startup phases:', file = stream)
+    for (_, begin), (label, end) in zip(marks, marks[1:]):
+        print('  {:<30} {:8.1f} ms'.format(label, (end - begin) * 1000), file = stream)
+        
+    print('  {:<30} {:8.1f} ms'.format('total', (marks[-1][1] - marks[0][1]) * 1000), file = stream)
+    
\ No newline at end of file
@@ -1,8 +1,138 @@
-from stl import mesh
+from functools import lru_cache
+import os
+import struct
 import numpy as np
 from BladeCalc import * 
 
 
+#Binary STL Record, Same Layout as stl.mesh.Mesh.dtype, numpy-stl
+#Itself Is Only Imported When a Mesh Object Is Asked For
+STL_DTYPE = np.dtype([('normals', '<f4', (3,)), ('vectors', '<f4', (3, 3)), ('attr', '<u2', (1,))])
+
+
+################################
+##Function: unitRing
+#Cached unit circle table for a given resolution,
+#points sit at (360 / res) * i degrees for i in 1..res
+##Inputs:
+#res: resoltution of shape (num of sides really)
+##Returns:
+#(cos, sin): read only arrays of length res
+################################
+@lru_cache(maxsize = 32)
+def unitRing(res):
+    angles = np.deg2rad((360 / res) * np.arange(1, res + 1))
+    ring = (np.cos(angles), np.sin(angles))
+    for table in ring:
+        table.flags.writeable = False
+        
+    return ring
+    
+    
+################################
+##Function: ringVertices
+#Places a ring of vertices at a given radius and height
+##Inputs:
+#radius: radius of ring (float)
+#z: height of ring (float)
+#res: resoltution of shape (num of sides really)
+##Returns:
+#vertices: (res, 3) array
+################################
+def ringVertices(radius, z, res):
+    cos, sin = unitRing(res)
+    vertices = np.empty((res, 3))
+    vertices[:, 0] = radius * cos
+    vertices[:, 1] = radius * sin
+    vertices[:, 2] = z
+    
+    return vertices
+    
+    
+################################
+##Function: IndexedMesh
+#Shared-vertex mesh, every transform works on the
+#vertex array only and the triangle soup numpy-stl
+#needs is only expanded when saving
+##Inputs:
+#vertices: (n, 3) vertex array
+#faces: (m, 3) face index array
+##Returns:
+#None
+################################
+class IndexedMesh():
+    def __init__(self, vertices, faces):
+        self.vertices = np.ascontiguousarray(vertices, dtype = np.float64)
+        self.faces = np.ascontiguousarray(faces, dtype = np.int32)
+        self._bounds = None
+        
+        
+    def __len__(self):
+        return self.faces.shape[0]
+        
+        
+    #Min and Max Corners (2, 3), Computed Once and Kept Up to Date by the Transforms
+    @property
+    def bounds(self):
+        if self._bounds is None:
+            self._bounds = np.array([self.vertices.min(axis = 0), self.vertices.max(axis = 0)])
+            
+        return self._bounds
+        
+        
+    #Triangle Soup (m, 3, 3), Same Layout as mesh.Mesh.vectors
+    @property
+    def vectors(self):
+        return self.vertices[self.faces]
+        
+        
+    #Flattened Triangles (m, 9), Same Layout as mesh.Mesh.points
+    @property
+    def points(self):
+        return self.vectors.reshape(-1, 9)
+        
+        
+    def rotate(self, axis, theta):
+        if not theta:
+            return
+        
+        rot = rotationMatrix(axis, theta)
+        self.vertices = self.vertices.dot(rot)
+        
+        #Quarter Turns Map the Box Onto a Box, Anything Else Needs a Fresh Reduction
+        if self._bounds is not None and np.allclose(np.abs(rot).sum(axis = 0), 1):
+            corners = self._bounds.dot(rot)
+            self._bounds = np.array([corners.min(axis = 0), corners.max(axis = 0)])
+        else:
+            self._bounds = None
+        
+        
+    def translate(self, offset):
+        self.vertices += offset
+        if self._bounds is not None:
+            self._bounds = self._bounds + offset
+            
+            
+    def copy(self):
+        return IndexedMesh(self.vertices.copy(), self.faces.copy())
+        
+        
+    #Expand to a numpy-stl Mesh, Normals Are Calculated Here
+    def toMesh(self):
+        from stl import mesh
+        
+        data = np.zeros(self.faces.shape[0], dtype=STL_DTYPE)
+        data['vectors'] = self.vectors
+        
+        return mesh.Mesh(data)
+        
+        
+    #Streams to a Binary STL Without Expanding the Whole Mesh
+    def save(self, filename):
+        with StlWriter(filename) as writer:
+            writer.write(self)
+        
+        
 ################################
 ##Function: drawCylinder
 #Draws cylinder with specified diamter, height and
@@ -12,54 +142,32 @@ from BladeCalc import *
 #height: height of cylinder
 #res: resoltution of shape (num of sides really)
 ##Returns:
-#cylinder: cylinder mesh object
+#cylinder: cylinder mesh object (IndexedMesh)
 ################################
 def drawCylinder(dia, height, res = 25):
-    botOrigin = [0, 0, 0]
-    topOrigin = [0, 0, height]
-    nspan = 1
-
-    #Draw Lower Verts 
-    vertices = [[botOrigin[0] + dia / 2 * np.cos(np.deg2rad((360 / res) * i)), botOrigin[1] + dia / 2 * np.sin(np.deg2rad((360 / res) * i)), botOrigin[2]] for i in range(1, res + 1)]
-    #Draw Upper Verts
-    vertices += [[topOrigin[0] + dia / 2 * np.cos(np.deg2rad((360 / res) * i)), topOrigin[1] + dia / 2 * np.sin(np.deg2rad((360 / res) * i)), topOrigin[2]] for i in range(1, res + 1)]
-    #Add Origins to Top and Bottom Faces
-    vertices.insert(int(len(vertices) / 2), topOrigin)
-    vertices.insert(0, botOrigin)
-
-    vertices = np.array([np.array(x) for x in vertices])
+    #Bottom Origin, Lower Verts, Top Origin, Upper Verts
+    vertices = np.concatenate([[[0, 0, 0]],
+                                ringVertices(dia / 2, 0, res),
+                                [[0, 0, height]],
+                                ringVertices(dia / 2, height, res)])
 
-    faces = []
+    vert = np.arange(res)
+    nextVert = (vert + 1) % res
+    
+    #Bottom Ring Starts at 1, Top Ring at res + 2
+    bot, botNext = vert + 1, nextVert + 1
+    top, topNext = vert + res + 2, nextVert + res + 2
     
     #Generate Bottom and Bottom-to-Top Faces
-    for vert in range(1, res + 1):
-        nextVert = vert + 1
-        if nextVert == res + 1:
-            nextVert = 1
-        faces.append([vert, nextVert, 0])
-        faces.append([vert, nextVert, vert + res + 1])
-
+    lower = np.stack([np.stack([bot, botNext, np.zeros_like(vert)], axis = -1),
+                        np.stack([bot, botNext, bot + res + 1], axis = -1)], axis = 1)
     #Generate Top and Top-to-Bottom Faces
-    for vert in range(res + 2, len(vertices)):
-        nextVert = vert + 1
-        conVert = vert - res
-        if nextVert == len(vertices):
-            nextVert = res + 2
-            conVert  = 1
-        faces.append([vert, nextVert, res + 1])
-        faces.append([vert, nextVert, conVert])
-
-    #Delete Any Duplicates IF Any Were Created
-    faces = np.array([list(x) for x in  set(tuple(x) for x in faces)])
-
-    # Create the mesh
-    cylinder = mesh.Mesh(np.zeros(faces.shape[0], dtype=mesh.Mesh.dtype))
-
-    for i, f in enumerate(faces):
-        for j in range(3):
-            cylinder.vectors[i][j] = vertices[f[j],:]
+    upper = np.stack([np.stack([top, topNext, np.full_like(vert, res + 1)], axis = -1),
+                        np.stack([top, topNext, botNext], axis = -1)], axis = 1)
+    
+    faces = np.concatenate([lower.reshape(-1, 3), upper.reshape(-1, 3)])
             
-    return cylinder
+    return IndexedMesh(vertices, faces)
     
 
 ################################
@@ -72,59 +180,34 @@ def drawCylinder(dia, height, res = 25):
 #height: height of cylinder
 #res: resoltution of shape (num of sides really)
 ##Returns:
-#duct: duct mesh object
+#duct: duct mesh object (IndexedMesh)
 ################################
 def drawDuct(innerDia, thickness, height, res = 25):
-    botOrigin = [0, 0, 0]
-    topOrigin = [0, 0, height]
-    nspan = 1    
-
-    #Draw Lower Outer Verts 
-    outer = [[botOrigin[0] + ((innerDia / 2) + thickness) * np.cos(np.deg2rad((360 / res) * i)), botOrigin[1] + ((innerDia / 2) + thickness) * np.sin(np.deg2rad((360 / res) * i)), botOrigin[2]] for i in range(1, res + 1)]
-    #Draw Upper Outer Verts
-    outer += [[topOrigin[0] + ((innerDia / 2) + thickness) * np.cos(np.deg2rad((360 / res) * i)), topOrigin[1] + ((innerDia / 2) + thickness) * np.sin(np.deg2rad((360 / res) * i)), topOrigin[2]] for i in range(1, res + 1)]
-    
-    #Draw Lower Outer Verts 
-    inner = [[botOrigin[0] + (innerDia / 2) * np.cos(np.deg2rad((360 / res) * i)), botOrigin[1] + (innerDia / 2) * np.sin(np.deg2rad((360 / res) * i)), botOrigin[2]] for i in range(1, res + 1)]
-    #Draw Upper Outer Verts
-    inner += [[topOrigin[0] + (innerDia / 2) * np.cos(np.deg2rad((360 / res) * i)), topOrigin[1] + (innerDia / 2) * np.sin(np.deg2rad((360 / res) * i)), topOrigin[2]] for i in range(1, res + 1)]
+    #Outer Lower, Outer Upper, Inner Lower, Inner Upper Verts
+    vertices = np.concatenate([ringVertices((innerDia / 2) + thickness, 0, res),
+                                ringVertices((innerDia / 2) + thickness, height, res),
+                                ringVertices(innerDia / 2, 0, res),
+                                ringVertices(innerDia / 2, height, res)])
     
-    vertices = np.array([np.array(x) for x in outer + inner])
-    
-    faces = []
+    vert = np.arange(res)
+    nextVert = (vert + 1) % res
     
     #Generate Bottom and Bottom-to-Top Faces
-    for vert in range(0,  res):
-        nextVert = vert + 1
-        if nextVert == res:
-            nextVert = 0
-        faces.append([vert, nextVert, vert + 2 * res])
-        faces.append([vert + 2 * res, nextVert + 2 * res, nextVert])
-        faces.append([vert, nextVert, vert + res])
-        faces.append([vert + 2 * res, nextVert + 2 * res, vert + res + 2 * res])
-        
+    lower = np.stack([np.stack([vert, nextVert, vert + 2 * res], axis = -1),
+                        np.stack([vert + 2 * res, nextVert + 2 * res, nextVert], axis = -1),
+                        np.stack([vert, nextVert, vert + res], axis = -1),
+                        np.stack([vert + 2 * res, nextVert + 2 * res, vert + 3 * res], axis = -1)], axis = 1)
+    
     #Generate Top and Top-to-Bottom Faces
-    for vert in range(res,  2 * res):
-        nextVert = vert + 1
-        conVert = vert - res + 1
-        if nextVert == 2 * res:
-            nextVert = res 
-            conVert = 0
-        faces.append([vert, nextVert, vert + 2 * res])
-        faces.append([vert + 2 * res, nextVert + 2 * res, nextVert])
-        faces.append([vert, nextVert, conVert])
-        faces.append([vert + 2 * res, nextVert + 2 * res, conVert + 2 * res])
-        
-    faces = np.array([list(x) for x in  set(tuple(x) for x in faces)])
-
-    # Create the mesh
-    duct = mesh.Mesh(np.zeros(faces.shape[0], dtype=mesh.Mesh.dtype))
-
-    for i, f in enumerate(faces):
-        for j in range(3):
-            duct.vectors[i][j] = vertices[f[j],:]
+    vert, nextVert = vert + res, nextVert + res
+    upper = np.stack([np.stack([vert, nextVert, vert + 2 * res], axis = -1),
+                        np.stack([vert + 2 * res, nextVert + 2 * res, nextVert], axis = -1),
+                        np.stack([vert, nextVert, nextVert - res], axis = -1),
+                        np.stack([vert + 2 * res, nextVert + 2 * res, nextVert + res], axis = -1)], axis = 1)
+        
+    faces = np.concatenate([lower.reshape(-1, 3), upper.reshape(-1, 3)])
             
-    return duct
+    return IndexedMesh(vertices, faces)
     
     
 ################################
@@ -140,12 +223,14 @@ def drawDuct(innerDia, thickness, height, res = 25):
 #rootChord: chord at root
 #tipChord: chord at tip
 #cot: center of twist coordinates
+#nspan: number of spanwise segments (int)
+#npts: number of chordwise points per surface (int)
 ##Returns:
-#bladeMesh: blade mesh object
+#bladeMesh: blade mesh object (IndexedMesh)
 ################################
-def drawBlade(camberRoot, camberTip, camberPos, thickness, bladeHeight, twistAngle, rootChord, tipChord, cot):
+def drawBlade(camberRoot, camberTip, camberPos, thickness, bladeHeight, twistAngle, rootChord, tipChord, cot, nspan = 1, npts = 24):
     #Draw Blade Profile
-    bladeProf = NACA4Blade(camberRoot = camberRoot,\
+    bladeVertices, bladeFaces = NACA4Blade(camberRoot = camberRoot,\
                             camberTip = camberTip,\
                             camberPos = camberPos,\
                             thickness = thickness,\
@@ -153,55 +238,317 @@ def drawBlade(camberRoot, camberTip, camberPos, thickness, bladeHeight, twistAng
                             twistAngle = twistAngle,\
                             rootChord = rootChord,\
                             tipChord = tipChord,\
-                            cot = cot)
-                            
-    #Blade Vertices
-    bladeVertices = np.array(bladeProf[1])
-    #Blade Faces
-    bladeFaces = np.array(bladeProf[0])
+                            cot = cot,\
+                            nspan = nspan,\
+                            npts = npts)
     
     #Generate Blade Mesh
-    bladeMesh = mesh.Mesh(np.zeros(bladeFaces.shape[0], dtype=mesh.Mesh.dtype))
-	
-    for i, f in enumerate(bladeFaces):
-        for j in range(3):
-            bladeMesh.vectors[i][j] = bladeVertices[f[j],:]
+    return IndexedMesh(bladeVertices, bladeFaces)
+
     
-    return bladeMesh
+################################
+##Function: patternBlade
+#Instances one blade mesh around an axis,
+#rotating every copy in a single batched product
+##Inputs:
+#blade: template blade (IndexedMesh)
+#angles: rotation of each copy in radians (array)
+#axis: axis to be rotated about (array)
+##Returns:
+#pattern: mesh object holding every copy (IndexedMesh)
+################################
+def patternBlade(blade, angles, axis = [1, 0, 0]):
+    angles = np.atleast_1d(angles)
+    
+    #Stack of Rotation Matrices, One Per Copy (N, 3, 3)
+    rot = rotationMatrix(axis, angles)
+    
+    #Rotate Every Copy at Once (N, V, 3)
+    vertices = np.matmul(blade.vertices[np.newaxis], rot)
+    
+    #Offset Each Copy's Faces Into Its Own Vertex Block
+    offsets = blade.vertices.shape[0] * np.arange(angles.shape[0], dtype = np.int32)
+    faces = blade.faces[np.newaxis] + offsets[:, np.newaxis, np.newaxis]
+    
+    return IndexedMesh(vertices.reshape(-1, 3), faces.reshape(-1, 3))
 
     
+################################
+##Function: decimateMesh
+#Vertex clustering decimation for previews, vertices are
+#snapped to a grid and merged per cell and faces that
+#collapse are dropped. The grid is coarsened until the
+#mesh fits the triangle budget, past the coarsest grid
+#the leftover faces are cut to the budget
+##Inputs:
+#mesh: mesh to reduce (IndexedMesh)
+#budget: maximum number of triangles, raised to 1 (int)
+##Returns:
+#preview: reduced mesh (IndexedMesh), mesh itself if it already fits
+################################
+def decimateMesh(mesh, budget):
+    budget = max(budget, 1)
+    if len(mesh) <= budget:
+        return mesh
+        
+    #Exact Extent, the Cached Bounds Can Be Off by Rounding
+    low = mesh.vertices.min(axis = 0)
+    span = max((mesh.vertices.max(axis = 0) - low).max(), 1e-12)
+    
+    #Merge Vertices Into Cells Along the Longest Side, Return Vertex Clusters and Surviving Faces
+    def cluster(cells):
+        index = np.floor((mesh.vertices - low) / (span / cells)).astype(np.int64)
+        cellId = np.ravel_multi_index(index.T, index.max(axis = 0) + 1)
+        clusters = np.unique(cellId, return_inverse = True)[1].reshape(-1)
+        
+        #Drop Collapsed Faces and Faces Left Doubled Up
+        faces = clusters[mesh.faces]
+        faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+        unique = np.unique(np.sort(faces, axis = 1), axis = 0, return_index = True)[1]
+        
+        return clusters, faces[np.sort(unique)]
+        
+    #Bisect for the Finest Grid That Fits the Budget
+    coarse, fine = 2, max(int(4 * np.sqrt(budget)), 3)
+    best = cluster(coarse)
+    while fine - coarse > 1:
+        cells = (coarse + fine) // 2
+        result = cluster(cells)
+        if result[1].shape[0] <= budget:
+            coarse, best = cells, result
+        else:
+            fine = cells
+            
+    clusters, faces = best
+    
+    #Even the Coarsest Grid Is Over a Tiny Budget, Keep What Fits
+    faces = faces[:budget]
+    
+    #Each Cell's Vertex Sits at the Mean of What It Merged
+    counts = np.bincount(clusters)
+    vertices = np.stack([np.bincount(clusters, weights = mesh.vertices[:, k]) for k in range(3)], axis = 1) / counts[:, np.newaxis]
+    
+    return IndexedMesh(vertices, faces)
+    
+    
+################################
+##Function: meshAxes
+#Adds 3D axes to a figure, importing mplot3d first as
+#older matplotlib only knows the '3d' projection once
+#it has been loaded
+##Inputs:
+#figure: figure to draw on (Figure)
+#args: subplot position, (1, 1, 1) if left out
+##Returns:
+#axes: 3D axes (Axes3D)
+################################
+def meshAxes(figure, *args):
+    from mpl_toolkits import mplot3d
+    
+    return figure.add_subplot(*(args or (1, 1, 1)), projection = '3d')
+    
+    
+################################
+##Function: plotMesh
+#Draws a mesh onto 3D matplotlib axes the way the
+#render window shows it, used by the GUI and by the
+#offscreen thumbnails
+##Inputs:
+#axes: 3D axes (Axes3D)
+#mesh: full mesh, sets the scale (IndexedMesh)
+#preview: mesh actually drawn (IndexedMesh), defaults to mesh
+##Returns:
+#None
+################################
+def plotMesh(axes, mesh, preview = None):
+    from mpl_toolkits import mplot3d
+    
+    if preview is None:
+        preview = mesh
+        
+    axes.add_collection3d(mplot3d.art3d.Poly3DCollection(preview.vectors))
+    
+    # Auto scale to the mesh size
+    scale = mesh.bounds.flatten()
+    axes.auto_scale_xyz(scale, scale, scale)
+    
+    axes.set_xlabel('X')
+    axes.set_ylabel('Y')
+    axes.set_zlabel('Z')
+    axes.set_xticklabels([])
+    axes.set_yticklabels([])
+    axes.set_zticklabels([])
+    
+    
+################################
+##Function: AssemblyBuilder
+#Joins component meshes into one assembly,
+#sizing a single vertex and face buffer from the
+#component counts and copying each component into
+#its own slice
+##Inputs:
+#None
+##Returns:
+#assembly: combined mesh object (IndexedMesh, from build)
+################################
+class AssemblyBuilder():
+    def __init__(self):
+        self.components = []
+        
+        
+    def add(self, component):
+        self.components.append(component)
+        return self
+        
+        
+    def __len__(self):
+        return sum(component.faces.shape[0] for component in self.components)
+        
+        
+    def build(self):
+        vertices = np.empty((sum(component.vertices.shape[0] for component in self.components), 3))
+        faces = np.empty((len(self), 3), dtype = np.int32)
+        
+        vStart = fStart = 0
+        for component in self.components:
+            vEnd = vStart + component.vertices.shape[0]
+            fEnd = fStart + component.faces.shape[0]
+            vertices[vStart:vEnd] = component.vertices
+            np.add(component.faces, vStart, out = faces[fStart:fEnd])
+            vStart, fStart = vEnd, fEnd
+            
+        assembly = IndexedMesh(vertices, faces)
+        
+        #Assembly Bounds Follow From the Component Bounds
+        if self.components:
+            bounds = np.array([component.bounds for component in self.components])
+            assembly._bounds = np.array([bounds[:, 0].min(axis = 0), bounds[:, 1].max(axis = 0)])
+            
+        return assembly
+        
+        
+    #Streams Each Component to a Binary STL Without Building the Assembly
+    def save(self, filename):
+        with StlWriter(filename) as writer:
+            for component in self.components:
+                writer.write(component)
+    
+    
+################################
+##Function: StlWriter
+#Streaming binary STL writer, the header is written
+#up front, triangles are expanded and written a chunk
+#at a time and the triangle count is patched on close,
+#a with block that raises removes the file instead
+##Inputs:
+#filename: path to .stl file (str)
+#name: solid name stored in the header (str)
+#chunk: triangles expanded per write (int)
+##Returns:
+#None
+################################
+class StlWriter():
+    def __init__(self, filename, name = 'CompPy', chunk = 65536):
+        self.chunk = chunk
+        self.count = 0
+        self.file = open(filename, 'wb')
+        
+        #Header Must Not Start With 'solid' or Readers Take It for ASCII
+        self.file.write(name.encode('ascii', 'replace')[:80].ljust(80, b' '))
+        self.file.write(struct.pack('<I', 0))
+        
+        
+    def __enter__(self):
+        return self
+        
+        
+    def __exit__(self, exc, *info):
+        if exc is not None:
+            self.abort()
+            return
+            
+        try:
+            self.close()
+            
+        except BaseException:
+            self.abort()
+            raise
+        
+        
+    #Write an IndexedMesh Chunk by Chunk
+    def write(self, component):
+        vertices, faces = component.vertices, component.faces
+        
+        for start in range(0, faces.shape[0], self.chunk):
+            vectors = vertices[faces[start:start + self.chunk]]
+            
+            data = np.zeros(vectors.shape[0], dtype=STL_DTYPE)
+            data['vectors'] = vectors
+            data['normals'] = np.cross(vectors[:, 1] - vectors[:, 0], vectors[:, 2] - vectors[:, 0])
+            
+            data.tofile(self.file)
+            self.count += data.shape[0]
+            
+            
+    def close(self):
+        if self.file.closed:
+            return
+        
+        #Patch the Triangle Count
+        self.file.seek(80)
+        self.file.write(struct.pack('<I', self.count))
+        self.file.close()
+        
+        
+    #Close and Delete the File, a Failed Write Must Not Leave a Truncated STL Behind
+    def abort(self):
+        #Only Plain Files, Never a Device Like /dev/stdout. Closing Flushes
+        #What Is Left in the Buffer, Which Fails Again on a Full Disk
+        try:
+            self.file.close()
+            
+        except OSError:
+            pass
+            
+        try:
+            if os.path.isfile(self.file.name):
+                os.remove(self.file.name)
+                
+        except OSError:
+            pass
+        
+        
 ################################
 ##Function: rotationMatrix
-#Generates rotational matrix, 
-#NOT USED, but helpful when necessary
+#Generates rotational matrix in the same
+#convention as mesh.rotate, theta may be an
+#array to get a stack of matrices
 ##Inputs:
 #axis: axis to be rotated about (array)
-#theta: angle to rotate (float)
+#theta: angle to rotate (float or array)
 ##Returns:
-#rotation matrix (array)
+#rotation matrix (array), shape theta.shape + (3, 3)
 ################################
 def rotationMatrix(axis, theta):
-    axis = np.asarray(axis)
+    axis = np.asarray(axis, dtype = np.float64)
+    theta = 0.5 * np.asarray(theta, dtype = np.float64)
+    
     # No need to rotate if there is no actual rotation
     if not axis.any():
-        return np.zeros((3, 3))
-
-    theta = 0.5 * np.asarray(theta)
+        return np.broadcast_to(np.identity(3), theta.shape + (3, 3)).copy()
 
     axis = axis / np.linalg.norm(axis)
 
     a = np.cos(theta)
-    b, c, d = - axis * np.sin(theta)
-    angles = a, b, c, d
-    powers = [x * y for x in angles for y in angles]
-    aa, ab, ac, ad = powers[0:4]
-    ba, bb, bc, bd = powers[4:8]
-    ca, cb, cc, cd = powers[8:12]
-    da, db, dc, dd = powers[12:16]
+    b, c, d = np.moveaxis(np.multiply.outer(np.sin(theta), -axis), -1, 0)
+    
+    aa, bb, cc, dd = a * a, b * b, c * c, d * d
+    ab, ac, ad = a * b, a * c, a * d
+    bc, bd, cd = b * c, b * d, c * d
 
-    return np.array([[aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac)],
-                        [2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab)],
-                        [2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc]])
+    return np.stack([np.stack([aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac)], axis = -1),
+                        np.stack([2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab)], axis = -1),
+                        np.stack([2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc], axis = -1)], axis = -2)
     
 ###USED FOR QUICK TESTING
     
@@ -219,7 +566,7 @@ if __name__ == '__main__':
     axes.add_collection3d(mplot3d.art3d.Poly3DCollection(cylinder.vectors))
 
     # Auto scale to the mesh size
-    scale = cylinder.points.flatten(-1)
+    scale = cylinder.vertices.flatten()
     axes.auto_scale_xyz(scale, scale, scale)
     
     xLabel = axes.set_xlabel('X', linespacing=3.2)